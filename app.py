@@ -3,60 +3,166 @@ Flask Web Application for Medium Article Scraping and Search
 DS Assignment 4 - Full Website + Deployment Ready
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 import os
+import json
+import threading
 import pandas as pd
 from scraper import scrape_medium_article, search_similar_articles
-import csv
+from ranking import search_bm25f, DEFAULT_FIELD_WEIGHTS
+from storage import ArticleStore, COLUMNS, DUPLICATE_OF_COLUMN
+from fields import safe_str, safe_int
+from dedupe import Deduplicator, DEDUPE_MODE
+from crawler import (
+    Crawler, DEFAULT_CHECKPOINT, CRAWL_API_ENABLED, CRAWL_ALLOWED_DOMAINS,
+    CRAWL_MAX_PAGES, CRAWL_MAX_DEPTH, CRAWL_MIN_DELAY,
+)
+from suggest import SuggestIndex, DEFAULT_LIMIT as SUGGEST_LIMIT, MAX_LIMIT as SUGGEST_MAX_LIMIT
+from vectorizer import HashingIndex
+from export import export_articles, parquet_available, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE
+from profiling import init_profiling
 
 app = Flask(__name__)
 
+# Optional request profiling (no-op unless PROFILING=true)
+init_profiling(app)
+
 # CSV file path
 CSV_FILE = 'scrapping_results.csv'
 
 # Global DataFrame to store articles in memory
 articles_df = None
 
+# Hashed TF-IDF index, kept current by the store's writer (no refit per search)
+hashing_index = HashingIndex()
+
+# Ranking engines selectable per search request (dispatched in run_search)
+RANKERS = ('tfidf', 'bm25f', 'hashing')
+DEFAULT_RANKER = 'tfidf'
+
+# Show only the best-ranked copy of syndicated (near-duplicate) articles
+COLLAPSE_DUPLICATES = os.environ.get('COLLAPSE_DUPLICATES', 'False').lower() == 'true'
+
+# Single writer for all CSV mutations (started on first use)
+article_store = None
+
+# Typeahead index, kept current by the store's writer
+suggest_index = SuggestIndex()
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the shared article store, starting its writer on first use"""
+    global article_store
+    with _store_lock:
+        if article_store is None:
+            deduper = Deduplicator() if DEDUPE_MODE != 'off' else None
+            article_store = ArticleStore(CSV_FILE, deduper=deduper, listeners=[suggest_index, hashing_index]).start()
+    return article_store
+
+def run_search(query, ranker=DEFAULT_RANKER, field_weights=None, top_n=10, collapse_duplicates=None):
+    """Run a search with the named ranking engine"""
+    if collapse_duplicates is None:
+        collapse_duplicates = COLLAPSE_DUPLICATES
+    deduper = get_store().deduper
+    collapse = collapse_duplicates and deduper is not None
+    
+    # Over-fetch so collapsing copies still leaves top_n results
+    fetch_n = top_n * 3 if collapse else top_n
+    if ranker == 'bm25f':
+        results = search_bm25f(query, CSV_FILE, top_n=fetch_n, field_weights=field_weights)
+    elif ranker == 'hashing':
+        results = hashing_index.search(query, top_n=fetch_n)
+    elif ranker == 'tfidf':
+        results = search_similar_articles(query, CSV_FILE, top_n=fetch_n)
+    else:
+        raise ValueError(f"Unknown ranker: {ranker}")
+    
+    return collapse_duplicate_results(results, top_n) if collapse else results
+
+def collapse_duplicate_results(results, top_n=10):
+    """Keep only the best-ranked result of each near-duplicate group"""
+    deduper = get_store().deduper
+    if deduper is None:
+        return results[:top_n]
+    
+    collapsed = []
+    seen = set()
+    for result in results:
+        canonical = deduper.canonical(result['article_id'])
+        if canonical not in seen:
+            seen.add(canonical)
+            collapsed.append(result)
+    return collapsed[:top_n]
+
 def load_articles():
-    """Load articles from CSV into global DataFrame"""
+    """Load articles from CSV into global DataFrame (indexed by stable ID)"""
     global articles_df
-    if os.path.exists(CSV_FILE):
-        try:
-            articles_df = pd.read_csv(CSV_FILE)
-            # Reset index to use as ID
-            articles_df.reset_index(drop=True, inplace=True)
-        except Exception as e:
-            print(f"Error loading CSV: {str(e)}")
-            articles_df = pd.DataFrame()
-    else:
+    try:
+        articles_df = get_store().read()
+    except Exception as e:
+        print(f"Error loading CSV: {str(e)}")
         articles_df = pd.DataFrame()
 
-# Initialize CSV file with headers if it doesn't exist
-def init_csv():
-    """Create CSV file with headers if it doesn't exist"""
-    if not os.path.exists(CSV_FILE):
-        headers = [
-            'Title', 'Subtitle', 'Full Text', 'Number of Images', 
-            'Image URLs', 'Number of External Links', 'Author Name', 
-            'Author Profile URL', 'Number of Claps', 'Reading Time', 
-            'Keywords', 'URL'
-        ]
-        with open(CSV_FILE, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(headers)
-
 @app.route('/')
 def index():
     """Home page - Scraping interface"""
     return render_template('index.html')
 
+def build_article_preview(article_id, article):
+    """
+    Build the JSON card payload for a scraped article
+    
+    Args:
+        article_id: Stable article ID assigned by the store
+        article: Scraper output dict (or a CSV row with the same columns)
+    """
+    # Truncate text to 200-300 characters
+    full_text = safe_str(article.get('Full Text', ''))
+    if len(full_text) > 300:
+        truncated_text = full_text[:300] + '...'
+    else:
+        truncated_text = full_text
+    
+    # Process keywords
+    keywords_str = safe_str(article.get('Keywords', ''))
+    keywords_list = []
+    if keywords_str and keywords_str != 'N/A' and keywords_str.strip():
+        keywords_list = [k.strip() for k in keywords_str.split(',') if k.strip()]
+    
+    # Process image URLs
+    image_urls_str = safe_str(article.get('Image URLs', ''))
+    image_urls_list = []
+    if image_urls_str and image_urls_str != 'N/A' and image_urls_str.strip():
+        image_urls_list = [url.strip() for url in image_urls_str.split(';') if url.strip()]
+    
+    return {
+        'id': article_id,
+        'title': safe_str(article.get('Title', 'N/A')),
+        'subtitle': safe_str(article.get('Subtitle', 'N/A')),
+        'text': truncated_text,
+        'num_images': safe_int(article.get('Number of Images', 0)),
+        'image_urls': image_urls_list,
+        'num_external_links': safe_int(article.get('Number of External Links', 0)),
+        'author': safe_str(article.get('Author Name', 'N/A')),
+        'author_url': safe_str(article.get('Author Profile URL', '')),
+        'claps': safe_int(article.get('Number of Claps', 0)),
+        'reading_time': safe_str(article.get('Reading Time', 'N/A')),
+        'keywords': keywords_list,
+        'url': safe_str(article.get('URL', '')),
+        'duplicate_of': safe_int(article[DUPLICATE_OF_COLUMN]) if safe_str(article.get(DUPLICATE_OF_COLUMN, '')) else None,
+    }
+
+def get_form_urls():
+    """Return the list of URLs posted in the scrape form"""
+    urls_text = request.form.get('urls', '')
+    return [url.strip() for url in urls_text.split('\n') if url.strip()]
+
 @app.route('/scrape', methods=['POST'])
 def scrape():
     """Handle article scraping request"""
     try:
         # Get URLs from form
-        urls_text = request.form.get('urls', '')
-        urls = [url.strip() for url in urls_text.split('\n') if url.strip()]
+        urls = get_form_urls()
         
         if not urls:
             return jsonify({'success': False, 'message': 'Please provide at least one URL'}), 400
@@ -77,83 +183,16 @@ def scrape():
             except Exception as e:
                 errors.append(f"Error scraping {url}: {str(e)}")
         
-        # Save to CSV
+        # Save to CSV (blocks until the writer has committed the batch)
         if results:
-            df = pd.DataFrame(results)
-            # Ensure all columns exist
-            columns = [
-                'Title', 'Subtitle', 'Full Text', 'Number of Images', 
-                'Image URLs', 'Number of External Links', 'Author Name', 
-                'Author Profile URL', 'Number of Claps', 'Reading Time', 
-                'Keywords', 'URL'
-            ]
-            
-            # Reorder columns and fill missing ones
-            for col in columns:
-                if col not in df.columns:
-                    df[col] = ''
-            
-            df = df[columns]
+            new_ids = get_store().append(results)
             
-            # Append to CSV
-            if os.path.exists(CSV_FILE):
-                df.to_csv(CSV_FILE, mode='a', header=False, index=False, encoding='utf-8')
-            else:
-                df.to_csv(CSV_FILE, mode='w', header=True, index=False, encoding='utf-8')
-            
-            # Reload articles into memory
-            load_articles()
-            
-            # Prepare scraped articles for display (stay on same page)
-            global articles_df
-            scraped_articles = []
-            if articles_df is not None and not articles_df.empty:
-                # Get the newly scraped articles (last N articles)
-                for i in range(len(results)):
-                    idx = len(articles_df) - len(results) + i
-                    if idx >= 0:
-                        article_row = articles_df.iloc[idx]
-                        
-                        # Safely convert fields to strings
-                        def safe_str(value):
-                            if pd.isna(value) or value is None:
-                                return ''
-                            return str(value)
-                        
-                        # Truncate text to 200-300 characters
-                        full_text = safe_str(article_row.get('Full Text', ''))
-                        if len(full_text) > 300:
-                            truncated_text = full_text[:300] + '...'
-                        else:
-                            truncated_text = full_text
-                        
-                        # Process keywords
-                        keywords_str = safe_str(article_row.get('Keywords', ''))
-                        keywords_list = []
-                        if keywords_str and keywords_str != 'N/A' and keywords_str.strip():
-                            keywords_list = [k.strip() for k in keywords_str.split(',') if k.strip()]
-                        
-                        # Process image URLs
-                        image_urls_str = safe_str(article_row.get('Image URLs', ''))
-                        image_urls_list = []
-                        if image_urls_str and image_urls_str != 'N/A' and image_urls_str.strip():
-                            image_urls_list = [url.strip() for url in image_urls_str.split(';') if url.strip()]
-                        
-                        scraped_articles.append({
-                            'id': idx,
-                            'title': safe_str(article_row.get('Title', 'N/A')),
-                            'subtitle': safe_str(article_row.get('Subtitle', 'N/A')),
-                            'text': truncated_text,
-                            'num_images': int(article_row.get('Number of Images', 0)) if pd.notna(article_row.get('Number of Images')) else 0,
-                            'image_urls': image_urls_list,
-                            'num_external_links': int(article_row.get('Number of External Links', 0)) if pd.notna(article_row.get('Number of External Links')) else 0,
-                            'author': safe_str(article_row.get('Author Name', 'N/A')),
-                            'author_url': safe_str(article_row.get('Author Profile URL', '')),
-                            'claps': int(article_row.get('Number of Claps', 0)) if pd.notna(article_row.get('Number of Claps')) else 0,
-                            'reading_time': safe_str(article_row.get('Reading Time', 'N/A')),
-                            'keywords': keywords_list,
-                            'url': safe_str(article_row.get('URL', '')),
-                        })
+            # Prepare scraped articles for display (stay on same page),
+            # built from the scraped dicts rather than re-reading the CSV
+            scraped_articles = [
+                build_article_preview(article_id, article_data)
+                for article_id, article_data in zip(new_ids, results)
+            ]
             
             return jsonify({
                 'success': True,
@@ -173,6 +212,61 @@ def scrape():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Server error: {str(e)}'}), 500
 
+@app.route('/scrape/stream', methods=['POST'])
+def scrape_stream():
+    """
+    Scrape URLs and stream each result as NDJSON the moment it is ready
+    
+    Emits one JSON object per line:
+        {"type": "article", "article": {...}}   - scraped and saved
+        {"type": "error", "url": ..., "message": ...}
+        {"type": "done", "success": ..., "scraped": ..., "errors": [...], "message": ...}
+    """
+    urls = get_form_urls()
+    
+    if not urls:
+        return jsonify({'success': False, 'message': 'Please provide at least one URL'}), 400
+    
+    store = get_store()
+    
+    def generate():
+        scraped = 0
+        errors = []
+        
+        for url in urls:
+            try:
+                article_data = scrape_medium_article(url)
+                if article_data:
+                    article_data['URL'] = url
+                    # Concurrent streams are group-committed by the writer
+                    article_id = store.append([article_data])[0]
+                    scraped += 1
+                    event = {'type': 'article', 'article': build_article_preview(article_id, article_data)}
+                else:
+                    error = f"Failed to scrape: {url}"
+                    errors.append(error)
+                    event = {'type': 'error', 'url': url, 'message': error}
+            except Exception as e:
+                error = f"Error scraping {url}: {str(e)}"
+                errors.append(error)
+                event = {'type': 'error', 'url': url, 'message': error}
+            
+            yield json.dumps(event) + '\n'
+        
+        yield json.dumps({
+            'type': 'done',
+            'success': scraped > 0,
+            'scraped': scraped,
+            'errors': errors,
+            'message': f'Successfully scraped {scraped} article(s)' if scraped else 'No articles were successfully scraped',
+        }) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 @app.route('/search')
 def search_page():
     """Search page"""
@@ -206,23 +300,11 @@ def articles_list():
 def delete_article(article_id):
     """Delete an article from CSV"""
     try:
-        global articles_df
-        load_articles()
-        
-        if articles_df is None or articles_df.empty:
-            return jsonify({'success': False, 'message': 'No articles found'}), 404
-        
-        if article_id < 0 or article_id >= len(articles_df):
+        # Write a tombstone; other article IDs stay unchanged
+        if not get_store().delete(article_id):
             return jsonify({'success': False, 'message': 'Article not found'}), 404
         
-        # Remove the article from DataFrame
-        articles_df = articles_df.drop(articles_df.index[article_id])
-        
-        # Reset index to maintain sequential IDs
-        articles_df.reset_index(drop=True, inplace=True)
-        
-        # Save updated DataFrame to CSV
-        articles_df.to_csv(CSV_FILE, index=False, encoding='utf-8')
+        load_articles()
         
         return jsonify({'success': True, 'message': 'Article deleted successfully'}), 200
     
@@ -238,18 +320,12 @@ def article_detail(article_id):
     if articles_df is None or articles_df.empty:
         return redirect(url_for('articles_list'))
     
-    if article_id < 0 or article_id >= len(articles_df):
+    if article_id not in articles_df.index:
         return redirect(url_for('articles_list'))
     
-    article = articles_df.iloc[article_id].to_dict()
-    
-    # Safely convert all fields to strings and handle NaN
-    def safe_str(value):
-        if pd.isna(value) or value is None:
-            return ''
-        return str(value)
-    
-    # Process all article fields safely
+    article = articles_df.loc[article_id].to_dict()
+
+    # Process all article fields safely (NaN becomes empty)
     article['Title'] = safe_str(article.get('Title', ''))
     article['Subtitle'] = safe_str(article.get('Subtitle', ''))
     article['Full Text'] = safe_str(article.get('Full Text', ''))
@@ -276,9 +352,9 @@ def article_detail(article_id):
     article['image_urls_list'] = image_urls_list
     
     # Ensure numeric fields are safe
-    article['Number of Images'] = int(article.get('Number of Images', 0)) if pd.notna(article.get('Number of Images')) else 0
-    article['Number of External Links'] = int(article.get('Number of External Links', 0)) if pd.notna(article.get('Number of External Links')) else 0
-    article['Number of Claps'] = int(article.get('Number of Claps', 0)) if pd.notna(article.get('Number of Claps')) else 0
+    article['Number of Images'] = safe_int(article.get('Number of Images', 0))
+    article['Number of External Links'] = safe_int(article.get('Number of External Links', 0))
+    article['Number of Claps'] = safe_int(article.get('Number of Claps', 0))
     
     return render_template('article_detail.html', article=article, article_id=article_id)
 
@@ -301,6 +377,26 @@ def api_search():
         if not query:
             return jsonify({'error': 'Query cannot be empty'}), 400
         
+        # Optional ranking engine and BM25F field weights
+        ranker = str(data.get('ranker', DEFAULT_RANKER)).strip().lower()
+        if ranker not in RANKERS:
+            return jsonify({'error': f"Unknown ranker: {ranker}. Choose one of: {', '.join(RANKERS)}"}), 400
+        
+        field_weights = data.get('field_weights')
+        if field_weights is not None:
+            if not isinstance(field_weights, dict) or any(
+                k not in DEFAULT_FIELD_WEIGHTS or not isinstance(v, (int, float)) or v < 0
+                for k, v in field_weights.items()
+            ):
+                return jsonify({'error': f"field_weights must map {', '.join(DEFAULT_FIELD_WEIGHTS)} to non-negative numbers"}), 400
+        
+        # Optional per-request override of COLLAPSE_DUPLICATES
+        collapse_duplicates = data.get('collapse_duplicates')
+        if collapse_duplicates is None:
+            collapse_duplicates = COLLAPSE_DUPLICATES
+        elif not isinstance(collapse_duplicates, bool):
+            return jsonify({'error': 'collapse_duplicates must be true or false'}), 400
+        
         # Check if CSV exists
         if not os.path.exists(CSV_FILE):
             return jsonify({'error': 'No articles found. Please scrape some articles first.'}), 404
@@ -312,8 +408,8 @@ def api_search():
         if articles_df is None or articles_df.empty:
             return jsonify({'error': 'No articles found. Please scrape some articles first.'}), 404
         
-        # Perform search using TF-IDF similarity
-        similar_articles = search_similar_articles(query, CSV_FILE, top_n=10)
+        # Perform search using the selected ranker (TF-IDF by default)
+        similar_articles = run_search(query, ranker, field_weights, collapse_duplicates=collapse_duplicates)
         
         # If search returns empty but we have data, try a simpler search
         if not similar_articles and not articles_df.empty:
@@ -332,6 +428,9 @@ def api_search():
                         'url': str(row.get('URL', '')),
                     })
             
+            if collapse_duplicates:
+                fallback_results = collapse_duplicate_results(fallback_results)
+            
             if fallback_results:
                 similar_articles = fallback_results[:10]
         
@@ -351,11 +450,188 @@ def api_search():
         print(error_msg)
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/api/suggest')
+def api_suggest():
+    """Typeahead suggestions for titles, keywords and authors (ranked by claps)"""
+    query = request.args.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.args.get('limit', SUGGEST_LIMIT)), SUGGEST_MAX_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    # Make sure the index has been built from the log
+    get_store()
+    
+    return jsonify(suggest_index.suggest(query, limit)), 200
+
+@app.route('/api/export')
+def api_export():
+    """
+    Stream the whole article corpus for bulk download
+    
+    Query parameters:
+        format: csv (default), ndjson or parquet
+        columns: Comma-separated column names (Article ID is always included)
+        since_id: Only articles with a larger Article ID
+        since: Only articles scraped after this ISO 8601 timestamp
+        gzip: 1/true to gzip the output
+        chunk_size: Rows encoded per chunk (default 1000)
+    """
+    fmt = request.args.get('format', 'csv').strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format: {fmt}. Choose one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires the pyarrow package'}), 501
+    
+    columns = None
+    columns_arg = request.args.get('columns', '').strip()
+    if columns_arg:
+        columns = [col.strip() for col in columns_arg.split(',') if col.strip()]
+        unknown = [col for col in columns if col not in COLUMNS]
+        if unknown:
+            return jsonify({'error': f"Unknown column(s): {', '.join(unknown)}"}), 400
+    
+    since_id = None
+    if request.args.get('since_id'):
+        try:
+            since_id = int(request.args['since_id'])
+        except ValueError:
+            return jsonify({'error': 'since_id must be an integer'}), 400
+    
+    since = None
+    if request.args.get('since'):
+        try:
+            since = pd.Timestamp(request.args['since'])
+            since = since.tz_localize('UTC') if since.tzinfo is None else since.tz_convert('UTC')
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+    
+    try:
+        chunk_size = max(1, min(int(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE)), 50000))
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be an integer'}), 400
+    
+    gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    
+    # Make sure the log exists and is in the current layout before streaming
+    get_store()
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f'articles.{extension}'
+    if gzip and fmt != 'parquet':
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    
+    stream = export_articles(
+        CSV_FILE, fmt,
+        columns=columns,
+        since_id=since_id,
+        since=since,
+        gzip=gzip,
+        chunksize=chunk_size,
+    )
+    
+    return Response(
+        stream_with_context(stream),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
+
+# Background crawl started through the API (one at a time)
+crawl_job = None
+crawl_thread = None
+_crawl_lock = threading.Lock()
+
+def domain_allowed(domain):
+    """Return True if a domain is (a subdomain of) a CRAWL_DOMAINS entry"""
+    domain = str(domain).strip().lower()
+    return any(domain == d or domain.endswith('.' + d) for d in CRAWL_ALLOWED_DOMAINS)
+
+@app.route('/api/crawl', methods=['GET', 'POST', 'DELETE'])
+def api_crawl():
+    """
+    Control a background crawl that feeds the shared article store
+    
+    Disabled unless CRAWL_API=true. GET returns the crawl status, DELETE
+    stops it, and POST starts one with a JSON body like:
+        {"seeds": ["https://medium.com/tag/python"], "max_pages": 200,
+         "max_depth": 2, "delay": 1.0, "domains": ["medium.com"], "resume": false}
+    Domains must be within CRAWL_DOMAINS, max_pages between 1 and
+    CRAWL_MAX_PAGES, max_depth at most CRAWL_MAX_DEPTH, and delay is raised
+    to at least CRAWL_MIN_DELAY.
+    """
+    global crawl_job, crawl_thread
+    if not CRAWL_API_ENABLED:
+        return jsonify({'error': 'The crawl API is disabled (set CRAWL_API=true to enable it)'}), 403
+    
+    with _crawl_lock:
+        running = crawl_thread is not None and crawl_thread.is_alive()
+        
+        if request.method == 'GET':
+            if crawl_job is None:
+                return jsonify({'running': False}), 200
+            return jsonify({'running': running, 'stats': crawl_job.stats, 'frontier': len(crawl_job.frontier)}), 200
+        
+        if request.method == 'DELETE':
+            if not running:
+                return jsonify({'error': 'No crawl is running'}), 404
+            crawl_job.stop()
+            return jsonify({'success': True, 'message': 'Crawl will stop after the current page'}), 200
+        
+        if running:
+            return jsonify({'error': 'A crawl is already running'}), 409
+        
+        data = request.get_json(silent=True) or {}
+        seeds = data.get('seeds', [])
+        if not isinstance(seeds, list) or not all(isinstance(url, str) for url in seeds):
+            return jsonify({'error': 'seeds must be a list of URLs'}), 400
+        
+        domains = data.get('domains') or CRAWL_ALLOWED_DOMAINS
+        if not isinstance(domains, list) or not all(domain_allowed(d) for d in domains):
+            return jsonify({'error': f"domains must be within: {', '.join(CRAWL_ALLOWED_DOMAINS)}"}), 400
+        
+        try:
+            max_pages = int(data.get('max_pages', CRAWL_MAX_PAGES))
+            max_depth = int(data.get('max_depth', min(3, CRAWL_MAX_DEPTH)))
+            delay = max(CRAWL_MIN_DELAY, float(data.get('delay', CRAWL_MIN_DELAY)))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_depth, max_pages and delay must be numbers'}), 400
+        if not 1 <= max_pages <= CRAWL_MAX_PAGES:
+            return jsonify({'error': f'max_pages must be between 1 and {CRAWL_MAX_PAGES}'}), 400
+        if not 0 <= max_depth <= CRAWL_MAX_DEPTH:
+            return jsonify({'error': f'max_depth must be between 0 and {CRAWL_MAX_DEPTH}'}), 400
+        
+        job = Crawler(
+            get_store(),
+            allowed_domains=domains,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            delay=delay,
+            checkpoint=DEFAULT_CHECKPOINT,
+        )
+        
+        if not (data.get('resume') and job.load_checkpoint()):
+            job.mark_known_articles(CSV_FILE)
+        job.add_seeds(seeds)
+        
+        if not job.frontier:
+            return jsonify({'error': 'Nothing to crawl: give seeds or resume an unfinished crawl'}), 400
+        
+        queued = len(job.frontier)
+        crawl_job = job
+        crawl_thread = threading.Thread(target=job.run, name='crawler', daemon=True)
+        crawl_thread.start()
+    
+    return jsonify({'success': True, 'frontier': queued, 'max_pages': max_pages, 'delay': delay}), 202
+
 @app.route('/search_results', methods=['POST'])
 def search_results():
     """Handle search request and return results"""
     try:
         query = request.form.get('query', '').strip()
+        ranker = request.form.get('ranker', DEFAULT_RANKER).strip().lower()
+        if ranker not in RANKERS:
+            ranker = DEFAULT_RANKER
         
         if not query:
             return render_template('results.html', 
@@ -381,7 +657,8 @@ def search_results():
                                  message='No articles found. Please scrape some articles first.')
         
         # Perform search - reload CSV fresh for search
-        similar_articles = search_similar_articles(query, CSV_FILE, top_n=10)
+        collapse_duplicates = COLLAPSE_DUPLICATES
+        similar_articles = run_search(query, ranker, collapse_duplicates=collapse_duplicates)
         
         # If search returns empty but we have data, try a simpler search
         if not similar_articles and not articles_df.empty:
@@ -399,11 +676,14 @@ def search_results():
                         'title': str(row.get('Title', 'N/A')),
                         'url': str(row.get('URL', '')),
                         'similarity': 50.0,  # Default similarity for fallback
-                        'claps': int(row.get('Number of Claps', 0)) if pd.notna(row.get('Number of Claps')) else 0,
+                        'claps': safe_int(row.get('Number of Claps', 0)),
                         'author': str(row.get('Author Name', 'N/A')),
                         'reading_time': str(row.get('Reading Time', 'N/A')),
                     })
             
+            if collapse_duplicates:
+                fallback_results = collapse_duplicate_results(fallback_results)
+            
             if fallback_results:
                 similar_articles = fallback_results[:10]
         
@@ -428,11 +708,8 @@ def search_results():
                              message=f'Search error: {str(e)}')
 
 if __name__ == '__main__':
-    # Initialize CSV on startup
-    init_csv()
-    
-    # Load articles into memory
-    load_articles()
+    # The CSV is created and loaded by the article store on the first request,
+    # so the debug reloader's parent process never starts a second writer
     
     # Get port from environment variable (for deployment) or use default
     port = int(os.environ.get('PORT', 5000))
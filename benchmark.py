@@ -0,0 +1,295 @@
+"""
+Search Benchmarks
+Compare ranking engines on latency and index size
+
+Usage:
+    python benchmark.py ranking                      # use scrapping_results.csv
+    python benchmark.py ranking --synthetic 5000     # generated corpus
+    python benchmark.py vectorizer --synthetic 5000 --rare-words 50000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from ranking import BM25FIndex, search_bm25f
+from scraper import preprocess_text, search_similar_articles
+from storage import COLUMNS, ID_COLUMN, read_articles
+from vectorizer import HASHING_FEATURES, HashingIndex, combined_text
+
+DEFAULT_QUERIES = [
+    'machine learning',
+    'python data science tutorial',
+    'smart cities',
+    'startup growth marketing',
+    'neural networks deep learning',
+]
+
+WORDS = (
+    'data science machine learning python model neural network deep training '
+    'startup product growth marketing design user research city smart urban '
+    'health fitness writing career money investing crypto blockchain cloud '
+    'kubernetes docker devops security privacy javascript react frontend api'
+).split()
+
+
+def make_synthetic_csv(path, num_articles, seed=42, rare_words=0):
+    """
+    Write a CSV log with generated articles
+
+    Args:
+        rare_words: Size of a long-tail vocabulary ("term123") mixed into
+            titles and bodies, so the corpus has more terms than a capped
+            vocabulary keeps
+    """
+    rng = random.Random(seed)
+
+    def words(k):
+        chosen = rng.choices(WORDS, k=k)
+        if rare_words:
+            for i in range(0, k, 5):
+                chosen[i] = f'term{rng.randrange(rare_words)}'
+        return ' '.join(chosen)
+
+    rows = []
+    for article_id in range(num_articles):
+        rows.append({
+            ID_COLUMN: article_id,
+            'Title': words(6),
+            'Subtitle': words(10),
+            'Full Text': words(rng.randint(200, 1200)),
+            'Number of Images': rng.randint(0, 10),
+            'Image URLs': 'N/A',
+            'Number of External Links': rng.randint(0, 20),
+            'Author Name': f'Author {rng.randint(1, 500)}',
+            'Author Profile URL': 'N/A',
+            'Number of Claps': rng.randint(0, 5000),
+            'Reading Time': f'{rng.randint(1, 15)} min read',
+            'Keywords': ', '.join(rng.sample(WORDS, 4)),
+            'URL': f'https://medium.com/@synthetic/article-{article_id}',
+        })
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+
+
+def time_call(func, repeat):
+    """Return a list of wall-clock timings in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def retained_bytes(build):
+    """Call build() and return (its result, bytes still allocated once it returns)"""
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def tfidf_index_size(csv_file):
+    """Fit the TF-IDF ranker's vectorizer and return (nnz, bytes, vocabulary)"""
+    df = read_articles(csv_file)
+    for col in ['Title', 'Subtitle', 'Full Text', 'Keywords']:
+        df[col] = df[col].fillna('').astype(str)
+    combined = (
+        df['Title'] + ' ' + df['Title'] + ' ' +
+        df['Keywords'] + ' ' + df['Keywords'] + ' ' +
+        df['Subtitle'] + ' ' + df['Full Text']
+    ).apply(preprocess_text)
+
+    def fit():
+        # Keep what a search uses: the matrix, vocabulary and IDF weights
+        vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2), min_df=1)
+        return vectorizer.fit_transform(combined), vectorizer.vocabulary_, vectorizer.idf_
+
+    (matrix, vocabulary, _), size = retained_bytes(fit)
+    return matrix.nnz, size, len(vocabulary)
+
+
+def bench_ranking(csv_file, queries, repeat):
+    """Print latency and index size for the TF-IDF and BM25F rankers"""
+    num_articles = len(read_articles(csv_file))
+    print(f"Corpus: {num_articles} article(s), {len(queries)} query(ies), {repeat} run(s) each")
+    print()
+
+    tfidf_times = []
+    for query in queries:
+        tfidf_times += time_call(lambda: search_similar_articles(query, csv_file), repeat)
+
+    build_times = time_call(lambda: BM25FIndex(read_articles(csv_file)), max(1, repeat // 2))
+
+    # First call builds and caches the index; later calls reuse it
+    search_bm25f(queries[0], csv_file)
+    bm25f_times = []
+    for query in queries:
+        bm25f_times += time_call(lambda: search_bm25f(query, csv_file), repeat)
+
+    nnz, tfidf_bytes, vocabulary = tfidf_index_size(csv_file)
+    df = read_articles(csv_file)
+    bm25f_index, bm25f_bytes = retained_bytes(lambda: BM25FIndex(df))
+    postings, terms = bm25f_index.size()
+
+    print(f"{'ranker':<10} {'median ms':>10} {'p95 ms':>10}")
+    for name, times in [('tfidf', tfidf_times), ('bm25f', bm25f_times)]:
+        p95 = sorted(times)[int(len(times) * 0.95) - 1] if len(times) > 1 else times[0]
+        print(f"{name:<10} {statistics.median(times):>10.2f} {p95:>10.2f}")
+    print(f"bm25f index build: {statistics.median(build_times):.2f} ms (once per CSV change)")
+    print()
+    print("index memory (bytes allocated by the build that stay allocated):")
+    print(f"tfidf: {tfidf_bytes / 1024:.1f} KiB for {nnz} non-zeros, {vocabulary} features (capped at 5000)")
+    print(f"bm25f: {bm25f_bytes / 1024:.1f} KiB for {postings} postings, {terms} terms (uncapped)")
+
+
+def exact_rankings(csv_file, queries, top_n):
+    """
+    Rank with an uncapped TF-IDF vocabulary (the reference for recall)
+
+    Returns:
+        list: One set of article IDs per query (matches with similarity > 0)
+    """
+    df = read_articles(csv_file)
+    ids, texts = [], []
+    for article_id, row in df.iterrows():
+        text = combined_text(row)
+        if text:
+            ids.append(int(article_id))
+            texts.append(text)
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=1)
+    matrix = vectorizer.fit_transform(texts)
+    rankings = []
+    for query in queries:
+        scores = cosine_similarity(vectorizer.transform([preprocess_text(query)]), matrix)[0]
+        top = [i for i in np.argsort(-scores, kind='stable')[:top_n] if scores[i] > 0]
+        rankings.append({ids[i] for i in top})
+    return rankings, len(vectorizer.vocabulary_)
+
+
+def recall(results, expected):
+    """Fraction of the expected IDs found among the results"""
+    if not expected:
+        return 1.0
+    return len({r['article_id'] for r in results if r['similarity'] > 0} & expected) / len(expected)
+
+
+def bench_vectorizer(csv_file, queries, repeat, n_features=HASHING_FEATURES, top_n=10, title_queries=10):
+    """Print recall and latency of the capped TF-IDF ranker and the hashing index"""
+    df = read_articles(csv_file)
+
+    # Known-item queries: look up the titles of a few stored articles
+    titles = df['Title'].dropna().astype(str)
+    titles = titles[~titles.isin(['', 'N/A'])]
+    queries = list(queries) + titles.sample(min(title_queries, len(titles)), random_state=1).tolist()
+    print(f"Corpus: {len(df)} article(s), {len(queries)} query(ies) "
+          f"({min(title_queries, len(titles))} title lookups), {repeat} run(s) each")
+    print()
+
+    expected, vocabulary = exact_rankings(csv_file, queries, top_n)
+
+    tfidf_times, tfidf_recall = [], []
+    for query, ids in zip(queries, expected):
+        tfidf_times += time_call(lambda: search_similar_articles(query, csv_file, top_n), repeat)
+        tfidf_recall.append(recall(search_similar_articles(query, csv_file, top_n), ids))
+
+    index = HashingIndex(n_features)
+    build_times = time_call(lambda: index.rebuild(df), max(1, repeat // 2))
+
+    # Insert a tenth of the corpus one article at a time, as the writer does
+    index.rebuild(df.iloc[:len(df) - max(1, len(df) // 10)])
+    start = time.perf_counter()
+    for article_id, row in df.iloc[len(df) - max(1, len(df) // 10):].iterrows():
+        index.on_insert(int(article_id), row)
+    insert_ms = (time.perf_counter() - start) * 1000 / max(1, len(df) // 10)
+
+    index.search(queries[0], top_n)  # fold in the inserts
+
+    # The first search after a write pays for folding it in
+    last_id, last_row = int(df.index[-1]), df.iloc[-1]
+    fold_times = []
+    for _ in range(repeat):
+        index.on_delete(last_id)
+        index.search(queries[0], top_n)
+        index.on_insert(last_id, last_row.copy())
+        start = time.perf_counter()
+        index.search(queries[0], top_n)
+        fold_times.append((time.perf_counter() - start) * 1000)
+
+    hashing_times, hashing_recall = [], []
+    for query, ids in zip(queries, expected):
+        hashing_times += time_call(lambda: index.search(query, top_n), repeat)
+        hashing_recall.append(recall(index.search(query, top_n), ids))
+
+    def build_hashing():
+        fresh = HashingIndex(n_features)
+        fresh.rebuild(df)
+        return fresh
+
+    nnz, _ = index.size()
+    _, hashing_bytes = retained_bytes(build_hashing)
+    tfidf_nnz, tfidf_bytes, tfidf_vocabulary = tfidf_index_size(csv_file)
+
+    print(f"{'ranker':<10} {'recall@' + str(top_n):>10} {'median ms':>10} {'p95 ms':>10}")
+    for name, times, recalls in [('tfidf', tfidf_times, tfidf_recall), ('hashing', hashing_times, hashing_recall)]:
+        p95 = sorted(times)[int(len(times) * 0.95) - 1] if len(times) > 1 else times[0]
+        print(f"{name:<10} {statistics.mean(recalls):>10.3f} {statistics.median(times):>10.2f} {p95:>10.2f}")
+    print(f"(recall against uncapped TF-IDF over {vocabulary} features)")
+    print()
+    print(f"hashing index build: {statistics.median(build_times):.2f} ms, "
+          f"incremental insert: {insert_ms:.2f} ms/article (no refit)")
+    print(f"first search after a single insert: {statistics.median(fold_times):.2f} ms "
+          f"(median of {len(fold_times)}; steady-state median {statistics.median(hashing_times):.2f} ms)")
+    print("index memory (bytes allocated by the build that stay allocated):")
+    print(f"tfidf:   {tfidf_bytes / 1024:.1f} KiB for {tfidf_nnz} non-zeros, "
+          f"{tfidf_vocabulary} features (capped at 5000)")
+    print(f"hashing: {hashing_bytes / 1024:.1f} KiB for {nnz} non-zeros "
+          f"and {index.n_features} document-frequency counters")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark search components')
+    parser.add_argument('suite', choices=['ranking', 'vectorizer'], help='Benchmark to run')
+    parser.add_argument('--csv', default='scrapping_results.csv', help='CSV log to benchmark against')
+    parser.add_argument('--synthetic', type=int, default=0, help='Generate a corpus of N articles instead')
+    parser.add_argument('--rare-words', type=int, default=0, help='Long-tail vocabulary size for --synthetic')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+    parser.add_argument('--query', action='append', help='Query to run (repeatable)')
+    parser.add_argument('--features', type=int, default=HASHING_FEATURES, help='Hash space for the vectorizer suite')
+    args = parser.parse_args()
+
+    queries = args.query or DEFAULT_QUERIES
+    tmp_dir = None
+    csv_file = args.csv
+
+    try:
+        if args.synthetic:
+            tmp_dir = tempfile.mkdtemp()
+            csv_file = os.path.join(tmp_dir, 'synthetic.csv')
+            make_synthetic_csv(csv_file, args.synthetic, rare_words=args.rare_words)
+
+        if args.suite == 'ranking':
+            bench_ranking(csv_file, queries, args.repeat)
+        elif args.suite == 'vectorizer':
+            bench_vectorizer(csv_file, queries, args.repeat, args.features)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""
+Crawler Module
+Grows the corpus by following tag and author pages
+
+Articles link to tag pages (/tag/...) and author profiles (/@author); those
+listing pages link to more articles. The crawler keeps a prioritized
+frontier of URLs to visit, remembers visited URLs in a Bloom filter (a few
+bits per URL instead of the URL itself), obeys depth, domain and page
+limits, waits between requests, and checkpoints its state to disk so an
+interrupted crawl can be resumed.
+
+The web app only exposes POST /api/crawl when CRAWL_API is true, and
+clamps API crawls to the CRAWL_* limits below.
+
+Usage (stop the web app first, or use POST /api/crawl instead):
+    python crawler.py --seed https://medium.com/tag/python --max-pages 500
+    python crawler.py --resume                      # continue from checkpoint
+    python crawler.py --seed http://localhost:8000/tag/test --domain localhost
+"""
+
+import argparse
+import base64
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+from scraper import get_headers, scrape_medium_article
+from storage import DUPLICATE_OF_COLUMN, read_articles
+
+DEFAULT_CHECKPOINT = 'crawl_state.json'
+DEFAULT_DOMAINS = ['medium.com']
+
+# Limits for crawls started through the web API (from environment variables)
+CRAWL_API_ENABLED = os.environ.get('CRAWL_API', 'False').lower() == 'true'
+CRAWL_ALLOWED_DOMAINS = [
+    d.strip().lower() for d in os.environ.get('CRAWL_DOMAINS', ','.join(DEFAULT_DOMAINS)).split(',') if d.strip()
+]
+CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', '1000'))
+CRAWL_MAX_DEPTH = int(os.environ.get('CRAWL_MAX_DEPTH', '5'))
+CRAWL_MIN_DELAY = float(os.environ.get('CRAWL_MIN_DELAY', '1.0'))
+
+# Lower priority values are crawled first: shallow before deep, and at the
+# same depth articles before listing pages
+LISTING_PENALTY = 0.5
+
+# Author profile (/@name) with no article slug after it
+_AUTHOR_PAGE_RE = re.compile(r'^/@[^/]+/?$')
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set (no false negatives)"""
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        """Add an item; return True if it was (probably) new"""
+        new = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, item):
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+    def to_dict(self):
+        return {
+            'num_bits': self.num_bits,
+            'num_hashes': self.num_hashes,
+            'count': self.count,
+            'bits': base64.b64encode(bytes(self.bits)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        bloom = cls.__new__(cls)
+        bloom.num_bits = data['num_bits']
+        bloom.num_hashes = data['num_hashes']
+        bloom.count = data['count']
+        bloom.bits = bytearray(base64.b64decode(data['bits']))
+        return bloom
+
+
+def normalize_url(url):
+    """Canonical form used for the visited set: no query, fragment or trailing slash"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((scheme, parts.netloc.lower(), path, '', ''))
+
+
+def is_listing_url(url):
+    """Tag pages and author profiles list articles rather than being one"""
+    path = urlsplit(url).path
+    return '/tag/' in path or bool(_AUTHOR_PAGE_RE.match(path))
+
+
+class Crawler:
+    """
+    Prioritized, checkpointed crawl that feeds articles into an ArticleStore
+
+    Args:
+        store: Started ArticleStore that receives scraped articles
+        allowed_domains: Host names (and their subdomains) that may be fetched
+        max_depth: Links further than this many hops from a seed are dropped
+        max_pages: Stop after fetching this many pages (0 = no limit)
+        delay: Seconds to wait between requests
+        max_frontier: Upper bound on queued URLs (memory cap)
+        checkpoint: Path of the JSON checkpoint file (None disables it)
+        checkpoint_every: Pages between checkpoints
+        bloom_capacity: Expected number of distinct URLs
+    """
+
+    def __init__(self, store, allowed_domains=None, max_depth=3, max_pages=1000, delay=1.0,
+                 max_frontier=100000, checkpoint=DEFAULT_CHECKPOINT, checkpoint_every=25,
+                 bloom_capacity=1000000):
+        self.store = store
+        self.allowed_domains = [d.lower() for d in (allowed_domains or DEFAULT_DOMAINS)]
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.delay = delay
+        self.max_frontier = max_frontier
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+
+        self.frontier = []  # heap of (priority, seq, url, depth)
+        self.visited = BloomFilter(bloom_capacity)
+        self.seq = 0
+        self.stats = {'pages': 0, 'articles': 0, 'listings': 0, 'errors': 0, 'duplicates': 0}
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Frontier
+    # ------------------------------------------------------------------
+
+    def allowed(self, url):
+        """Return True if the URL's host is within the allowed domains"""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            return False
+        host = (parts.hostname or '').lower()
+        return any(host == d or host.endswith('.' + d) for d in self.allowed_domains)
+
+    def enqueue(self, url, depth):
+        """Add a URL to the frontier unless seen, off-domain, too deep or full"""
+        url = normalize_url(url)
+        if depth > self.max_depth or not self.allowed(url):
+            return False
+        if len(self.frontier) >= self.max_frontier or not self.visited.add(url):
+            return False
+        priority = depth + (LISTING_PENALTY if is_listing_url(url) else 0)
+        heapq.heappush(self.frontier, (priority, self.seq, url, depth))
+        self.seq += 1
+        return True
+
+    def add_seeds(self, urls):
+        """Queue seed URLs at depth 0"""
+        return sum(self.enqueue(url, 0) for url in urls)
+
+    def mark_known_articles(self, csv_file):
+        """Treat every article already in the corpus as visited"""
+        df = read_articles(csv_file)
+        if 'URL' in df.columns:
+            for url in df['URL'].dropna():
+                self.visited.add(normalize_url(str(url)))
+
+    # ------------------------------------------------------------------
+    # Crawling
+    # ------------------------------------------------------------------
+
+    def stop(self):
+        """Ask a running crawl to stop after the current page"""
+        self._stop.set()
+
+    def run(self):
+        """Crawl until the frontier is empty, max_pages is hit or stop() is called"""
+        self._stop.clear()
+        try:
+            while self.frontier and not self._stop.is_set():
+                if self.max_pages and self.stats['pages'] >= self.max_pages:
+                    break
+
+                _, _, url, depth = heapq.heappop(self.frontier)
+                self.crawl_page(url, depth)
+
+                if self.checkpoint and self.stats['pages'] % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+
+                if self.frontier and self._stop.wait(self.delay):
+                    break
+        finally:
+            if self.checkpoint:
+                self.save_checkpoint()
+        return self.stats
+
+    def crawl_page(self, url, depth):
+        """Fetch one URL and queue the links it leads to"""
+        self.stats['pages'] += 1
+        try:
+            if is_listing_url(url):
+                links = self.fetch_listing(url)
+                self.stats['listings'] += 1
+            else:
+                links = []
+                article = scrape_medium_article(url, discovered_links=links, allowed=self.allowed)
+                if article is None:
+                    self.stats['errors'] += 1
+                    return
+                article['URL'] = url
+                self.store.append([article])
+                if article.get(DUPLICATE_OF_COLUMN) is not None:
+                    self.stats['duplicates'] += 1
+                self.stats['articles'] += 1
+
+            for link in links:
+                self.enqueue(link, depth + 1)
+        except Exception as e:
+            print(f"Crawl error for {url}: {str(e)}")
+            self.stats['errors'] += 1
+
+    def fetch_listing(self, url):
+        """Return every link on a tag or author page"""
+        response = requests.get(url, headers=get_headers(), timeout=10)
+        response.raise_for_status()
+        if not self.allowed(response.url):
+            raise ValueError(f"Redirected outside the allowed domains: {response.url}")
+        soup = BeautifulSoup(response.content, 'html.parser')
+        return [urljoin(response.url, a.get('href', '')) for a in soup.find_all('a', href=True)]
+
+    # ------------------------------------------------------------------
+    # Checkpointing
+    # ------------------------------------------------------------------
+
+    def save_checkpoint(self):
+        """Atomically write the frontier, visited set and stats"""
+        state = {
+            'frontier': self.frontier,
+            'seq': self.seq,
+            'stats': self.stats,
+            'visited': self.visited.to_dict(),
+        }
+        tmp_file = self.checkpoint + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.checkpoint)
+
+    def load_checkpoint(self):
+        """
+        Restore state from the checkpoint file; return False if there is none
+
+        The checkpoint may come from a crawl with wider limits, so queued URLs
+        outside this crawler's domains or deeper than its max_depth are dropped.
+        """
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return False
+        with open(self.checkpoint, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.frontier = [
+            tuple(entry) for entry in state['frontier']
+            if entry[3] <= self.max_depth and self.allowed(entry[2])
+        ]
+        heapq.heapify(self.frontier)
+        self.seq = state['seq']
+        self.stats.update(state['stats'])
+        self.visited = BloomFilter.from_dict(state['visited'])
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl tag and author pages for more articles')
+    parser.add_argument('--seed', action='append', default=[], help='Start URL (repeatable)')
+    parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint')
+    parser.add_argument('--csv', default='scrapping_results.csv', help='CSV log to add articles to')
+    parser.add_argument('--domain', action='append', help='Allowed domain (repeatable, default medium.com)')
+    parser.add_argument('--max-depth', type=int, default=3)
+    parser.add_argument('--max-pages', type=int, default=1000, help='0 for no limit')
+    parser.add_argument('--delay', type=float, default=1.0, help='Seconds between requests')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    args = parser.parse_args()
+
+    from dedupe import Deduplicator, DEDUPE_MODE
+    from storage import ArticleStore
+
+    deduper = Deduplicator() if DEDUPE_MODE != 'off' else None
+    store = ArticleStore(args.csv, deduper=deduper).start()
+    crawler = Crawler(
+        store,
+        allowed_domains=args.domain,
+        max_depth=args.max_depth,
+        max_pages=args.max_pages,
+        delay=args.delay,
+        checkpoint=args.checkpoint,
+    )
+
+    if args.resume and crawler.load_checkpoint():
+        print(f"Resumed: {len(crawler.frontier)} URL(s) queued, {crawler.stats['pages']} page(s) done")
+    else:
+        crawler.mark_known_articles(args.csv)
+    crawler.add_seeds(args.seed)
+
+    if not crawler.frontier:
+        parser.error('Nothing to crawl: give --seed URLs or --resume an unfinished crawl')
+
+    try:
+        stats = crawler.run()
+    except KeyboardInterrupt:
+        stats = crawler.stats
+        print('Interrupted; state saved to checkpoint')
+    finally:
+        store.stop()
+
+    print(f"Crawled {stats['pages']} page(s): {stats['articles']} article(s), "
+          f"{stats['listings']} listing page(s), {stats['duplicates']} duplicate(s), "
+          f"{stats['errors']} error(s); {len(crawler.frontier)} URL(s) left in frontier")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Near-Duplicate Detection Module
+MinHash signatures and an LSH index over article text
+
+The same Medium story is often syndicated under several URLs (publication
+and personal profile, query-string variants). Each article's Full Text is
+reduced to a MinHash signature; an LSH index (banding) finds candidate
+duplicates on insert without comparing against the whole corpus.
+
+Run as a script to find (and optionally delete) duplicates already stored:
+    python dedupe.py              # report duplicate groups
+    python dedupe.py --delete     # tombstone every non-canonical copy
+"""
+
+import argparse
+import os
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from storage import read_articles
+
+# Configuration (from environment variables)
+DEDUPE_MODE = os.environ.get('DEDUPE_MODE', 'flag').lower()  # flag, merge or off
+DEDUPE_THRESHOLD = float(os.environ.get('DEDUPE_THRESHOLD', '0.8'))
+
+# MinHash / LSH parameters: 16 bands x 8 rows puts the LSH S-curve
+# midpoint near 0.7 Jaccard, below the default confirmation threshold
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5        # Words per shingle
+MIN_WORDS = 20          # Shorter texts are too small to compare reliably
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed so signatures are comparable across processes and restarts
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def minhash_signature(text):
+    """
+    Compute the MinHash signature of a text's word shingles
+
+    Returns:
+        ndarray: NUM_PERM uint32 values, or None if the text is too short
+    """
+    if text is None or pd.isna(text):
+        return None
+    words = _WORD_RE.findall(str(text).lower())
+    if len(words) < MIN_WORDS:
+        return None
+
+    shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    # Universal hashing (a*x + b) mod p, one row per permutation
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+class LSHIndex:
+    """
+    Banded LSH index that groups near-duplicate articles
+
+    Every article belongs to a group named after its canonical (first
+    inserted) article ID.
+    """
+
+    def __init__(self, threshold=DEDUPE_THRESHOLD):
+        self.threshold = threshold
+        self.buckets = [dict() for _ in range(BANDS)]  # band key -> set of IDs
+        self.signatures = {}
+        self.canonical_of = {}
+        self.groups = {}  # canonical ID -> set of member IDs
+
+    @staticmethod
+    def _band_keys(signature):
+        return [signature[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+    def query(self, signature):
+        """
+        Find the closest stored article sharing at least one band
+
+        Returns:
+            tuple: (article ID, estimated similarity), or (None, 0.0)
+        """
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self.buckets[band].get(key, ()))
+
+        best_id, best_score = None, 0.0
+        for candidate in candidates:
+            score = similarity(signature, self.signatures[candidate])
+            if score > best_score or (score == best_score and best_id is not None and candidate < best_id):
+                best_id, best_score = candidate, score
+        return best_id, best_score
+
+    def find_duplicate(self, signature):
+        """Return the canonical ID this signature duplicates, or None"""
+        match, score = self.query(signature)
+        if match is None or score < self.threshold:
+            return None
+        return self.canonical_of[match]
+
+    def add(self, article_id, signature, duplicate_of=None):
+        """Insert an article; duplicate_of is the canonical ID it copies"""
+        canonical = duplicate_of if duplicate_of in self.groups else article_id
+        self.signatures[article_id] = signature
+        self.canonical_of[article_id] = canonical
+        self.groups.setdefault(canonical, set()).add(article_id)
+        for band, key in enumerate(self._band_keys(signature)):
+            self.buckets[band].setdefault(key, set()).add(article_id)
+
+    def remove(self, article_id):
+        """Remove an article, promoting the next oldest copy if it was canonical"""
+        signature = self.signatures.pop(article_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(article_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+        canonical = self.canonical_of.pop(article_id)
+        members = self.groups.pop(canonical)
+        members.discard(article_id)
+        if members:
+            new_canonical = canonical if canonical != article_id else min(members)
+            self.groups[new_canonical] = members
+            for member in members:
+                self.canonical_of[member] = new_canonical
+
+    def canonical(self, article_id):
+        """Return the canonical ID of an article (itself if unique or unknown)"""
+        return self.canonical_of.get(article_id, article_id)
+
+    def duplicate_groups(self):
+        """Return {canonical ID: sorted duplicate IDs} for groups with copies"""
+        return {
+            canonical: sorted(m for m in members if m != canonical)
+            for canonical, members in self.groups.items()
+            if len(members) > 1
+        }
+
+
+class Deduplicator:
+    """
+    Hooks near-duplicate detection into the article store
+
+    prepare() runs in the request thread (signature cost); check(), add()
+    and remove() run on the store's single writer thread, so the
+    check-then-insert is race free.
+    """
+
+    def __init__(self, mode=DEDUPE_MODE, threshold=DEDUPE_THRESHOLD):
+        self.mode = mode
+        self.index = LSHIndex(threshold)
+
+    def prepare(self, article):
+        """Attach the article's MinHash signature"""
+        article['_minhash'] = minhash_signature(article.get('Full Text'))
+
+    def check(self, article):
+        """Return the canonical ID the article duplicates, or None"""
+        signature = article.get('_minhash')
+        if signature is None:
+            return None
+        return self.index.find_duplicate(signature)
+
+    def add(self, article_id, article, duplicate_of=None):
+        signature = article.get('_minhash')
+        if signature is not None:
+            self.index.add(article_id, signature, duplicate_of)
+
+    def remove(self, article_id):
+        self.index.remove(article_id)
+
+    def canonical(self, article_id):
+        return self.index.canonical(article_id)
+
+    def rebuild(self, df):
+        """Index every stored article in ID order (oldest copy is canonical)"""
+        self.index = LSHIndex(self.index.threshold)
+        if 'Full Text' not in df.columns:
+            return
+        for article_id, text in df['Full Text'].sort_index().items():
+            article = {'Full Text': text}
+            self.prepare(article)
+            self.add(int(article_id), article, self.check(article))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find near-duplicate articles in the CSV log')
+    parser.add_argument('--csv', default='scrapping_results.csv', help='CSV log to scan')
+    parser.add_argument('--threshold', type=float, default=DEDUPE_THRESHOLD, help='Minimum estimated Jaccard similarity')
+    parser.add_argument('--delete', action='store_true', help='Delete every non-canonical copy (stop the web app first)')
+    args = parser.parse_args()
+
+    df = read_articles(args.csv)
+    deduper = Deduplicator(threshold=args.threshold)
+    deduper.rebuild(df)
+    groups = deduper.index.duplicate_groups()
+
+    total = sum(len(copies) for copies in groups.values())
+    print(f"Scanned {len(df)} article(s): {len(groups)} duplicate group(s), {total} redundant copy(ies)")
+    for canonical, copies in sorted(groups.items()):
+        title = str(df.loc[canonical].get('Title', ''))
+        print(f"  [{canonical}] {title[:60]} <- {', '.join(str(c) for c in copies)}")
+
+    if args.delete and total:
+        from storage import ArticleStore
+        store = ArticleStore(args.csv, compact_interval=0).start()
+        try:
+            deleted = sum(store.delete(c) for copies in groups.values() for c in copies)
+            store.compact()
+        finally:
+            store.stop()
+        print(f"Deleted {deleted} duplicate(s)")
+
+
+if __name__ == '__main__':
+    main()
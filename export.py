@@ -0,0 +1,189 @@
+"""
+Bulk Export Module
+Streams the article corpus as CSV, NDJSON or Parquet
+
+Rows are read from the CSV log in fixed-size chunks and encoded one chunk
+at a time, so memory use stays bounded no matter how large the corpus is.
+Parquet support needs the optional pyarrow package.
+"""
+
+import zlib
+
+import pandas as pd
+
+from storage import COLUMNS, DUPLICATE_OF_COLUMN, ID_COLUMN, SCRAPED_AT_COLUMN, iter_article_chunks
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Columns stored as integers in typed formats (Parquet)
+INTEGER_COLUMNS = [ID_COLUMN, 'Number of Images', 'Number of External Links', 'Number of Claps']
+
+# Integer columns that may be empty; nulls are kept rather than set to 0
+NULLABLE_INTEGER_COLUMNS = [DUPLICATE_OF_COLUMN]
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def parquet_available():
+    """Return True if pyarrow is installed"""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def export_articles(csv_file, fmt='csv', columns=None, since_id=None, since=None,
+                    gzip=False, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Stream the live articles in the requested format
+
+    Args:
+        csv_file: Path to the CSV log
+        fmt: One of EXPORT_FORMATS
+        columns: Optional list of columns to include (ID is always first)
+        since_id: Only rows with an ID greater than this
+        since: Only rows scraped after this pandas.Timestamp (UTC)
+        gzip: Gzip the CSV/NDJSON output; Parquet uses its own gzip codec
+        chunksize: Rows read and encoded per step
+
+    Yields:
+        bytes: Encoded output, one piece per chunk
+    """
+    columns = [ID_COLUMN] + [col for col in (columns or COLUMNS) if col != ID_COLUMN]
+
+    # The timestamp filter needs the column even if it is not exported
+    read_columns = list(columns)
+    if since is not None and SCRAPED_AT_COLUMN not in read_columns:
+        read_columns.append(SCRAPED_AT_COLUMN)
+
+    chunks = (
+        _filter_chunk(chunk, columns, since_id, since)
+        for chunk in iter_article_chunks(csv_file, chunksize=chunksize, columns=read_columns)
+    )
+    chunks = (chunk for chunk in chunks if not chunk.empty)
+
+    if fmt == 'parquet':
+        return _iter_parquet(chunks, columns, compression='gzip' if gzip else 'snappy')
+
+    if fmt == 'ndjson':
+        pieces = _iter_ndjson(chunks)
+    else:
+        pieces = _iter_csv(chunks, columns)
+
+    return _gzip(pieces) if gzip else pieces
+
+
+def _filter_chunk(chunk, columns, since_id, since):
+    """Apply incremental filters and project to the exported columns"""
+    if since_id is not None:
+        chunk = chunk[chunk[ID_COLUMN] > since_id]
+    if since is not None and not chunk.empty:
+        if SCRAPED_AT_COLUMN in chunk.columns:
+            scraped_at = pd.to_datetime(chunk[SCRAPED_AT_COLUMN], utc=True, errors='coerce')
+            # Rows without a timestamp (scraped before it was recorded) are excluded
+            chunk = chunk[scraped_at > since]
+        else:
+            chunk = chunk.iloc[0:0]
+
+    # Columns missing from an old log are exported empty
+    for col in columns:
+        if col not in chunk.columns:
+            chunk[col] = ''
+    return chunk[columns]
+
+
+def _iter_csv(chunks, columns):
+    """Encode chunks as CSV with a single header row"""
+    yield pd.DataFrame(columns=columns).to_csv(index=False).encode('utf-8')
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=False).encode('utf-8')
+
+
+def _iter_ndjson(chunks):
+    """Encode chunks as one JSON object per line"""
+    for chunk in chunks:
+        data = chunk.to_json(orient='records', lines=True, force_ascii=False)
+        if not data.endswith('\n'):
+            data += '\n'
+        yield data.encode('utf-8')
+
+
+def _gzip(pieces):
+    """Gzip a stream of byte pieces on the fly"""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for piece in pieces:
+        data = compressor.compress(piece)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _StreamSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._buffer = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._buffer.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self._buffer)
+        self._buffer = []
+        return data
+
+
+def _iter_parquet(chunks, columns, compression):
+    """Encode chunks as Parquet, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (col, pa.int64() if col in INTEGER_COLUMNS + NULLABLE_INTEGER_COLUMNS else pa.string())
+        for col in columns
+    ])
+
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        for chunk in chunks:
+            chunk = chunk.copy()
+            for col in columns:
+                if col in INTEGER_COLUMNS:
+                    chunk[col] = pd.to_numeric(chunk[col], errors='coerce').fillna(0).astype('int64')
+                elif col in NULLABLE_INTEGER_COLUMNS:
+                    chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype('Int64')
+                else:
+                    chunk[col] = chunk[col].map(lambda v: None if pd.isna(v) else str(v))
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+
+    yield sink.drain()
@@ -0,0 +1,30 @@
+"""
+Article Field Helpers
+Safe conversions for values read from the CSV log or the scraper
+
+Fields can be missing, NaN (empty CSV cells) or the scraper's 'N/A'
+placeholder; these helpers turn them into plain strings and ints.
+"""
+
+import pandas as pd
+
+
+def safe_str(value):
+    """Safely convert a field to a string (NaN/None become empty)"""
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return ''
+    return str(value)
+
+
+def safe_int(value):
+    """Safely convert a numeric field to int (NaN/None/garbage become 0)"""
+    try:
+        return int(value) if pd.notna(value) else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def clean_field(value):
+    """Return a field as a stripped string, treating NaN and 'N/A' as empty"""
+    value = safe_str(value).strip()
+    return '' if value == 'N/A' else value
@@ -0,0 +1,189 @@
+"""
+Request Profiling Module
+On-demand and sampled profiling of Flask requests
+
+Profiling is off unless the PROFILING environment variable is true. When it
+is on, a request is profiled if it sends an "X-Profile: 1" header or a
+"profile=1" query parameter, or if it is picked by PROFILE_SAMPLE_RATE.
+When it is off, no hooks are registered, so requests pay no overhead.
+
+Profiles are saved to PROFILE_DIR and served from /api/profiles:
+    sampling mode -> .folded collapsed stacks (flamegraph.pl, speedscope)
+    cprofile mode -> .prof pstats dump (snakeviz, flameprof, pstats)
+"""
+
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, jsonify, request, send_from_directory
+
+# Configuration (from environment variables)
+PROFILING_ENABLED = os.environ.get('PROFILING', 'False').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sampling').lower()  # sampling or cprofile
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '1'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '200'))
+
+PROFILE_EXTENSIONS = ('.folded', '.prof')
+
+
+class SamplingProfiler:
+    """
+    Periodically samples the stack of one thread
+
+    Output is in collapsed-stack format: one "root;caller;callee count" line
+    per distinct stack.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL_MS / 1000.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class CProfileProfiler:
+    """Deterministic profiler (cProfile) for the current thread"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+def should_profile():
+    """Decide whether the current request is profiled"""
+    if request.path.startswith('/api/profiles'):
+        return False
+    if request.headers.get('X-Profile', '').lower() in ('1', 'true'):
+        return True
+    if request.args.get('profile', '').lower() in ('1', 'true'):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _profile_name():
+    """Build a unique, sortable file name stem for the current request"""
+    endpoint = (request.endpoint or 'unknown').replace('.', '_')
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}"
+
+
+def _prune_profiles():
+    """Keep only the newest PROFILE_KEEP profiles"""
+    files = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(PROFILE_EXTENSIONS))
+    for name in files[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+def _finish(profiler, name):
+    """Stop a profiler and write its output"""
+    profiler.stop()
+    extension = '.prof' if isinstance(profiler, CProfileProfiler) else '.folded'
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump(os.path.join(PROFILE_DIR, name + extension))
+        _prune_profiles()
+    except OSError as e:
+        print(f"Error saving profile {name}: {str(e)}")
+
+
+def init_profiling(app):
+    """Register profiling hooks and endpoints on the app if PROFILING is enabled"""
+    if not PROFILING_ENABLED:
+        return
+
+    @app.before_request
+    def start_profile():
+        if not should_profile():
+            return
+        if PROFILE_MODE == 'cprofile':
+            profiler = CProfileProfiler()
+        else:
+            profiler = SamplingProfiler(threading.get_ident())
+        g.profiler = profiler
+        g.profile_name = _profile_name()
+        profiler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        name = g.pop('profile_name')
+        response.headers['X-Profile-Id'] = name
+        if response.is_streamed:
+            # Streaming views do their work while the body is sent
+            response.call_on_close(lambda: _finish(profiler, name))
+        else:
+            _finish(profiler, name)
+        return response
+
+    @app.teardown_request
+    def abort_profile(exc):
+        # Request failed before after_request ran: still save what we have
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            _finish(profiler, g.pop('profile_name'))
+
+    @app.route('/api/profiles')
+    def list_profiles():
+        """List stored profiles, newest first"""
+        if not os.path.isdir(PROFILE_DIR):
+            return jsonify([])
+        files = sorted((f for f in os.listdir(PROFILE_DIR) if f.endswith(PROFILE_EXTENSIONS)), reverse=True)
+        return jsonify([
+            {'id': os.path.splitext(f)[0], 'file': f, 'url': f'/api/profiles/{f}'}
+            for f in files
+        ])
+
+    @app.route('/api/profiles/<path:filename>')
+    def get_profile(filename):
+        """Download a stored profile (a name from X-Profile-Id also works)"""
+        if not filename.endswith(PROFILE_EXTENSIONS):
+            for extension in PROFILE_EXTENSIONS:
+                if os.path.exists(os.path.join(PROFILE_DIR, filename + extension)):
+                    filename += extension
+                    break
+        return send_from_directory(os.path.abspath(PROFILE_DIR), filename, as_attachment=True)
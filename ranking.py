@@ -0,0 +1,202 @@
+"""
+Field-Weighted Ranking Module
+BM25F search over separately indexed article fields
+
+Instead of duplicating Title and Keywords inside one combined string (as the
+TF-IDF ranker does), each field is tokenized once and kept in its own
+postings. Field weights are applied at query time, so they can be changed
+per request without rebuilding the index.
+"""
+
+import math
+import os
+from collections import Counter, defaultdict
+
+from fields import clean_field, safe_int
+from scraper import preprocess_text
+from storage import read_articles, tombstone_path
+
+# Article columns indexed by the ranker, keyed by field name
+FIELDS = {
+    'title': 'Title',
+    'subtitle': 'Subtitle',
+    'keywords': 'Keywords',
+    'body': 'Full Text',
+}
+
+# Default weights mirror the old "double title and keywords" behaviour
+DEFAULT_FIELD_WEIGHTS = {
+    'title': 2.0,
+    'subtitle': 1.0,
+    'keywords': 2.0,
+    'body': 1.0,
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+class BM25FIndex:
+    """Per-field inverted index over a set of articles"""
+
+    def __init__(self, df):
+        """
+        Build the index from a DataFrame indexed by stable article ID
+
+        Rows without a title or body are skipped, like the TF-IDF ranker does.
+        """
+        self.postings = defaultdict(list)  # term -> [(row, field, tf), ...]
+        self.field_lengths = {field: [] for field in FIELDS}
+        self.article_ids = []
+        self.rows = []
+
+        for article_id, row in df.iterrows():
+            title = clean_field(row.get('Title', ''))
+            body = clean_field(row.get('Full Text', ''))
+            if not title or not body:
+                continue
+
+            doc = len(self.article_ids)
+            self.article_ids.append(int(article_id))
+            self.rows.append({
+                'title': title,
+                'url': str(row.get('URL', '')),
+                'claps': safe_int(row.get('Number of Claps', 0)),
+                'author': clean_field(row.get('Author Name', '')) or 'N/A',
+                'reading_time': clean_field(row.get('Reading Time', '')) or 'N/A',
+            })
+
+            for field, column in FIELDS.items():
+                tokens = preprocess_text(clean_field(row.get(column, ''))).split()
+                self.field_lengths[field].append(len(tokens))
+                for term, tf in Counter(tokens).items():
+                    self.postings[term].append((doc, field, tf))
+
+        self.num_docs = len(self.article_ids)
+        self.avg_lengths = {
+            field: (sum(lengths) / len(lengths) if lengths and sum(lengths) else 1.0)
+            for field, lengths in self.field_lengths.items()
+        }
+        # Document frequency counts a doc once even if the term is in several fields
+        self.doc_freq = {
+            term: len({doc for doc, _, _ in postings})
+            for term, postings in self.postings.items()
+        }
+
+    def size(self):
+        """Return (number of postings, number of distinct terms)"""
+        return sum(len(p) for p in self.postings.values()), len(self.postings)
+
+    def idf(self, term):
+        """BM25 inverse document frequency (always positive)"""
+        df = self.doc_freq.get(term, 0)
+        return math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+
+    def score(self, query, field_weights=None):
+        """
+        Score every document that shares a term with the query
+
+        Returns:
+            dict: Row position -> BM25F score
+        """
+        weights = dict(DEFAULT_FIELD_WEIGHTS)
+        if field_weights:
+            weights.update({k: float(v) for k, v in field_weights.items() if k in FIELDS})
+
+        terms = set(preprocess_text(query).split())
+        scores = defaultdict(float)
+
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            # Combine length-normalised field frequencies into one pseudo-tf
+            weighted_tf = defaultdict(float)
+            for doc, field, tf in postings:
+                length_norm = 1 - B + B * self.field_lengths[field][doc] / self.avg_lengths[field]
+                weighted_tf[doc] += weights[field] * tf / length_norm
+
+            idf = self.idf(term)
+            for doc, tf in weighted_tf.items():
+                scores[doc] += idf * tf / (K1 + tf)
+
+        return scores
+
+
+# Cached index per CSV file, rebuilt when the log or its tombstones change
+_index_cache = {}
+
+
+def _file_signature(path):
+    """Return (mtime, size) for a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def get_index(csv_file):
+    """Return a BM25F index for the CSV, reusing the cached one if still current"""
+    key = os.path.abspath(csv_file)
+    signature = (_file_signature(csv_file), _file_signature(tombstone_path(csv_file)))
+
+    cached = _index_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    index = BM25FIndex(read_articles(csv_file))
+    _index_cache[key] = (signature, index)
+    return index
+
+
+def search_bm25f(query, csv_file, top_n=10, field_weights=None):
+    """
+    Search for similar articles using field-weighted BM25 (BM25F)
+
+    Args:
+        query: Search query string
+        csv_file: Path to CSV file with scraped articles
+        top_n: Number of top results to return
+        field_weights: Optional dict overriding DEFAULT_FIELD_WEIGHTS
+            (keys: title, subtitle, keywords, body)
+
+    Returns:
+        list: Same result dictionaries as search_similar_articles; the
+            similarity is the score relative to the best match, in percent
+    """
+    try:
+        index = get_index(csv_file)
+        if index.num_docs == 0:
+            return []
+
+        scores = index.score(query, field_weights)
+        if not scores:
+            return []
+
+        # Sort by score (descending), then by claps (descending)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -index.rows[item[0]]['claps']))
+        best = ranked[0][1] or 1.0
+
+        results = []
+        for doc, score in ranked[:top_n]:
+            row = index.rows[doc]
+            results.append({
+                'article_id': index.article_ids[doc],
+                'title': row['title'],
+                'url': row['url'],
+                'similarity': round(score / best * 100, 2),
+                'claps': row['claps'],
+                'author': row['author'],
+                'reading_time': row['reading_time'],
+            })
+
+        return results
+
+    except Exception as e:
+        import traceback
+        print(f"Error in BM25F search: {str(e)}")
+        print(traceback.format_exc())
+        return []
@@ -13,6 +13,8 @@ import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import string
+from urllib.parse import urljoin
+from storage import read_articles
 
 # Download required NLTK data
 try:
@@ -64,10 +66,17 @@ def extract_number(text):
     
     return int(number)
 
-def scrape_medium_article(url):
+def scrape_medium_article(url, discovered_links=None, allowed=None):
     """
     Scrape a Medium article and extract all required fields
     
+    Args:
+        url: Article URL
+        discovered_links: Optional list; absolute URLs of the tag pages and
+            author profiles linked from the article are appended to it
+        allowed: Optional predicate on the final URL after redirects; the
+            page is not scraped if it returns False
+    
     Returns:
         dict: Dictionary containing article data or None if scraping fails
     """
@@ -80,6 +89,9 @@ def scrape_medium_article(url):
         headers = get_headers()
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
+        if allowed is not None and not allowed(response.url):
+            print(f"Redirected outside the allowed domains: {response.url}")
+            return None
         
         # Parse HTML
         soup = BeautifulSoup(response.content, 'html.parser')
@@ -176,6 +188,11 @@ def scrape_medium_article(url):
             elif href.startswith('http'):
                 author_profile_url = href
         
+        # Collect tag and author page links for the crawler
+        if discovered_links is not None:
+            for link in soup.find_all('a', href=re.compile(r'/tag/|/@')):
+                discovered_links.append(urljoin(response.url, link.get('href', '')))
+        
         # Extract Number of Claps
         claps = 0
         clap_elem = soup.find('button', {'data-testid': 'clap-button'})
@@ -279,8 +296,8 @@ def search_similar_articles(query, csv_file, top_n=10):
         list: List of dictionaries with article info and similarity scores
     """
     try:
-        # Read CSV fresh
-        df = pd.read_csv(csv_file)
+        # Read CSV fresh (live rows only, indexed by stable article ID)
+        df = read_articles(csv_file)
         
         if df.empty:
             return []
@@ -339,8 +356,8 @@ def search_similar_articles(query, csv_file, top_n=10):
             return []
         
         # Create TF-IDF vectorizer
-        # Use min_df=0 to handle small datasets
-        vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2), min_df=0)
+        # Use min_df=1 (keep every term) to handle small datasets
+        vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2), min_df=1)
         
         # Get all processed texts
         all_texts = list(df['processed_text'].astype(str))
@@ -385,10 +402,10 @@ def search_similar_articles(query, csv_file, top_n=10):
         # Format results
         results = []
         for idx, row in top_results.iterrows():
-            # Get original index (row number from CSV)
+            # Get original index (stable article ID)
             article_id = int(row['original_index']) if 'original_index' in row else int(idx)
             results.append({
-                'article_id': article_id,  # Original index from CSV
+                'article_id': article_id,  # Stable article ID
                 'title': str(row.get('Title', 'N/A')),
                 'url': str(row.get('URL', '')),
                 'similarity': round(float(row['similarity']) * 100, 2),  # Convert to percentage
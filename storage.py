@@ -0,0 +1,669 @@
+"""
+Article Storage Module
+Single-writer, group-commit storage for scraped articles
+
+All mutations (appends and deletes) go through one writer thread that
+drains a queue, batches pending operations into a single write and fsyncs
+once per batch. Deletes are recorded as tombstones in a sidecar file and
+a background compactor periodically rewrites the CSV without them.
+Article IDs are assigned by the writer, never change and are never reused:
+the next free ID is saved in a second sidecar file when compaction drops
+rows from the log.
+"""
+
+import csv
+import io
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# Column order of the CSV log
+ID_COLUMN = 'Article ID'
+
+ARTICLE_COLUMNS = [
+    'Title', 'Subtitle', 'Full Text', 'Number of Images',
+    'Image URLs', 'Number of External Links', 'Author Name',
+    'Author Profile URL', 'Number of Claps', 'Reading Time',
+    'Keywords', 'URL'
+]
+
+# When the writer committed the row (UTC, ISO 8601)
+SCRAPED_AT_COLUMN = 'Scraped At'
+
+# Canonical article ID when the row is a near-duplicate (see dedupe.py)
+DUPLICATE_OF_COLUMN = 'Duplicate Of'
+
+COLUMNS = [ID_COLUMN] + ARTICLE_COLUMNS + [SCRAPED_AT_COLUMN, DUPLICATE_OF_COLUMN]
+
+# Group commit tuning
+BATCH_MAX_OPS = 256          # Max operations committed in one batch
+BATCH_WINDOW_SECONDS = 0.005  # How long to wait for more ops after the first
+
+# Compaction tuning
+COMPACT_INTERVAL_SECONDS = 60  # How often the compactor checks the log
+COMPACT_MIN_TOMBSTONES = 1     # Tombstones needed before a rewrite
+
+
+# One lock per log file, shared by the writer and every reader in the process
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+def file_lock(csv_file):
+    """Return the lock that serialises access to a CSV log"""
+    key = os.path.abspath(csv_file)
+    with _file_locks_guard:
+        if key not in _file_locks:
+            _file_locks[key] = threading.RLock()
+        return _file_locks[key]
+
+
+def tombstone_path(csv_file):
+    """Return the path of the tombstone file that belongs to a CSV log"""
+    return os.path.splitext(csv_file)[0] + '.tombstones'
+
+
+def next_id_path(csv_file):
+    """Return the path of the file that records a CSV log's next free ID"""
+    return os.path.splitext(csv_file)[0] + '.nextid'
+
+
+def read_next_id(csv_file):
+    """Return the saved next free ID of a CSV log (0 if none was saved)"""
+    try:
+        with open(next_id_path(csv_file), 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _write_next_id(csv_file, next_id):
+    """Atomically save the next free ID"""
+    path = next_id_path(csv_file)
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(f'{next_id}\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+def read_tombstones(csv_file):
+    """Return the set of deleted article IDs for a CSV log"""
+    path = tombstone_path(csv_file)
+    deleted = set()
+    if not os.path.exists(path):
+        return deleted
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    deleted.add(int(line))
+                except ValueError:
+                    # Ignore a torn trailing line from a crash mid-write
+                    continue
+    return deleted
+
+
+def _fix_id_columns(df):
+    """Read ID-valued columns as nullable integers (pandas parses them as float)"""
+    if DUPLICATE_OF_COLUMN in df.columns:
+        df[DUPLICATE_OF_COLUMN] = pd.to_numeric(df[DUPLICATE_OF_COLUMN], errors='coerce').astype('Int64')
+
+
+def read_articles(csv_file):
+    """
+    Read the live articles from a CSV log
+
+    Returns:
+        DataFrame: Articles indexed by their stable ID, tombstoned rows removed
+    """
+    with file_lock(csv_file):
+        if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
+            return pd.DataFrame(columns=ARTICLE_COLUMNS)
+
+        df = pd.read_csv(csv_file)
+        deleted = read_tombstones(csv_file)
+
+    if ID_COLUMN not in df.columns:
+        # Legacy file written before stable IDs: row position is the ID
+        df[ID_COLUMN] = range(len(df))
+
+    df = df.dropna(subset=[ID_COLUMN])
+    df[ID_COLUMN] = df[ID_COLUMN].astype(int)
+    _fix_id_columns(df)
+
+    if deleted:
+        df = df[~df[ID_COLUMN].isin(deleted)]
+
+    df = df.set_index(ID_COLUMN)
+    df.index.name = None
+    return df
+
+
+class _BoundedReader:
+    """File wrapper that stops at a fixed byte offset"""
+
+    def __init__(self, f, limit):
+        self._f = f
+        self._remaining = limit
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def readline(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        line = self._f.readline(size)
+        self._remaining -= len(line)
+        return line
+
+    def readable(self):
+        return True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+
+def iter_article_chunks(csv_file, chunksize=1000, columns=None):
+    """
+    Stream live articles from a CSV log in chunks with bounded memory
+
+    Reads a consistent snapshot: rows appended or deleted after the call
+    starts are not seen, and a concurrent compaction does not disturb the
+    already open file.
+
+    Args:
+        csv_file: Path to the CSV log
+        chunksize: Rows per yielded DataFrame
+        columns: Optional list of columns to read (ID is always included)
+
+    Yields:
+        DataFrame: Chunks with the ID as a regular first column
+    """
+    with file_lock(csv_file):
+        if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
+            return
+        f = open(csv_file, 'rb')
+        limit = os.fstat(f.fileno()).st_size
+        deleted = read_tombstones(csv_file)
+
+    with f:
+        header = next(csv.reader([f.readline().decode('utf-8')]), [])
+        f.seek(0)
+        has_id = ID_COLUMN in header
+
+        usecols = None
+        if columns is not None:
+            usecols = [col for col in header if col in columns or col == ID_COLUMN]
+
+        reader = pd.read_csv(_BoundedReader(f, limit), chunksize=chunksize, usecols=usecols)
+        offset = 0
+        for chunk in reader:
+            if not has_id:
+                # Legacy file written before stable IDs: row position is the ID
+                chunk.insert(0, ID_COLUMN, range(offset, offset + len(chunk)))
+            offset += len(chunk)
+
+            chunk = chunk.dropna(subset=[ID_COLUMN])
+            chunk[ID_COLUMN] = chunk[ID_COLUMN].astype(int)
+            _fix_id_columns(chunk)
+            if deleted:
+                chunk = chunk[~chunk[ID_COLUMN].isin(deleted)]
+            if not chunk.empty:
+                yield chunk
+
+
+class _Op:
+    """A pending mutation waiting for the writer to commit it"""
+
+    def __init__(self, kind, payload=None):
+        self.kind = kind
+        self.payload = payload
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the writer has committed this operation"""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f'Storage {self.kind} was not committed in time')
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class ArticleStore:
+    """
+    Append-only article log with a single writer thread
+
+    Request handlers call append() and delete(); both block until the
+    batch containing their operation has been fsynced to disk. An optional
+    deduper (dedupe.Deduplicator) is consulted by the writer on every insert.
+
+    Listeners are in-memory indexes kept in step with the log. Each one has
+    rebuild(df), on_insert(article_id, article) and on_delete(article_id);
+    the writer calls the latter two after a batch is durably committed, so
+    they should be cheap. Expensive per-article work belongs in an optional
+    prepare(article), which append() runs in the caller's thread.
+    """
+
+    def __init__(self, csv_file, compact_interval=COMPACT_INTERVAL_SECONDS, deduper=None, listeners=None):
+        self.csv_file = csv_file
+        self.compact_interval = compact_interval
+        self.deduper = deduper
+        self.listeners = list(listeners or [])
+        self._queue = queue.Queue()
+        # Serialises file access between the writer and readers
+        self._lock = file_lock(csv_file)
+        self._next_id = 0
+        self._live_ids = set()
+        self._tombstones = 0
+        self._writer = None
+        self._compactor = None
+        self._stopping = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Open the log, recover state and start the background threads"""
+        if self._writer is not None:
+            return self
+
+        with self._lock:
+            self._open_log()
+            if self.deduper is not None or self.listeners:
+                df = read_articles(self.csv_file)
+                if self.deduper is not None:
+                    self.deduper.rebuild(df)
+                for listener in self.listeners:
+                    try:
+                        listener.rebuild(df)
+                    except Exception as e:
+                        print(f"Storage listener error: {str(e)}")
+
+        self._stopping.clear()
+        self._writer = threading.Thread(target=self._writer_loop, name='article-writer', daemon=True)
+        self._writer.start()
+
+        if self.compact_interval:
+            self._compactor = threading.Thread(target=self._compactor_loop, name='article-compactor', daemon=True)
+            self._compactor.start()
+
+        return self
+
+    def stop(self):
+        """Flush pending operations and stop the background threads"""
+        if self._writer is None:
+            return
+        self._stopping.set()
+        op = _Op('stop')
+        self._queue.put(op)
+        op.wait()
+        self._writer.join()
+        self._writer = None
+        self._compactor = None
+
+    def _open_log(self):
+        """Create or recover the log and work out the next free ID"""
+        # IDs of rows compacted away are only remembered in the sidecar
+        self._next_id = read_next_id(self.csv_file)
+
+        if not os.path.exists(self.csv_file):
+            with open(self.csv_file, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(COLUMNS)
+                f.flush()
+                os.fsync(f.fileno())
+
+        with open(self.csv_file, 'r', newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+
+        if header != COLUMNS:
+            # Old layout (e.g. no stable IDs yet): rewrite once in the new format
+            self._compact()
+            return
+
+        deleted = read_tombstones(self.csv_file)
+        df = pd.read_csv(self.csv_file, usecols=[ID_COLUMN])
+        ids = pd.to_numeric(df[ID_COLUMN], errors='coerce').dropna().astype(int)
+        self._live_ids = set(ids) - deleted
+        self._tombstones = len(deleted)
+        if not ids.empty:
+            self._next_id = max(self._next_id, int(ids.max()) + 1)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def append(self, articles, timeout=None):
+        """
+        Durably append articles to the log
+
+        Args:
+            articles: List of article dictionaries (scraper output plus URL)
+            timeout: Seconds to wait for the commit (None waits forever)
+
+        Returns:
+            list: Stable IDs assigned to the articles, in order. In merge
+                mode a near-duplicate is not stored and gets the ID of the
+                article it duplicates; its dict gets a 'Duplicate Of' key.
+        """
+        if not articles:
+            return []
+        for article in articles:
+            if self.deduper is not None:
+                self.deduper.prepare(article)
+            for listener in self.listeners:
+                if hasattr(listener, 'prepare'):
+                    try:
+                        listener.prepare(article)
+                    except Exception as e:
+                        print(f"Storage listener error: {str(e)}")
+        op = _Op('append', list(articles))
+        self._queue.put(op)
+        return op.wait(timeout)
+
+    def delete(self, article_id, timeout=None):
+        """
+        Durably delete an article by writing a tombstone
+
+        Returns:
+            bool: True if the article existed and was deleted
+        """
+        op = _Op('delete', int(article_id))
+        self._queue.put(op)
+        return op.wait(timeout)
+
+    def compact(self, timeout=None):
+        """Rewrite the log without tombstoned rows"""
+        op = _Op('compact')
+        self._queue.put(op)
+        return op.wait(timeout)
+
+    def read(self):
+        """Return the live articles as a DataFrame indexed by stable ID"""
+        return read_articles(self.csv_file)
+
+    def exists(self, article_id):
+        """Return True if an article ID has been assigned and not deleted"""
+        return article_id in self._live_ids
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _writer_loop(self):
+        """Drain the queue and commit operations in batches"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+            while len(batch) < BATCH_MAX_OPS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            stop = self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        """
+        Apply one batch of operations with a single fsync per file
+
+        ID, live-set and deduper changes are staged while the batch is built
+        and only applied once the write is durable; if it fails, the partial
+        write is truncated away and the staged changes are discarded.
+        """
+        rows = io.StringIO()
+        writer = csv.writer(rows)
+        scraped_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        next_id = self._next_id
+        added = set()
+        tombstones = []
+        inserted = []
+        pending = []
+        stop = False
+
+        def is_live(article_id):
+            return (article_id in self._live_ids or article_id in added) and article_id not in tombstones
+
+        for op in batch:
+            if op.kind == 'append':
+                ids = []
+                for article in op.payload:
+                    duplicate_of = self.deduper.check(article) if self.deduper is not None else None
+                    if duplicate_of is not None:
+                        article[DUPLICATE_OF_COLUMN] = duplicate_of
+                        if self.deduper.mode == 'merge':
+                            ids.append(duplicate_of)
+                            continue
+
+                    article_id = next_id
+                    next_id += 1
+                    writer.writerow(
+                        [article_id]
+                        + [_csv_value(article.get(col, '')) for col in ARTICLE_COLUMNS]
+                        + [scraped_at, _csv_value(duplicate_of)]
+                    )
+                    added.add(article_id)
+                    # Added now so later articles in the batch are checked against it
+                    if self.deduper is not None:
+                        self.deduper.add(article_id, article, duplicate_of)
+                    inserted.append((article_id, article))
+                    ids.append(article_id)
+                op.result = ids
+                pending.append(op)
+            elif op.kind == 'delete':
+                article_id = op.payload
+                if is_live(article_id):
+                    tombstones.append(article_id)
+                    op.result = True
+                else:
+                    op.result = False
+                pending.append(op)
+            else:
+                # Compaction and stop run after the appends/deletes before them
+                pending.append(op)
+
+        # IDs handed out in this batch are never reused, even if it fails
+        self._next_id = next_id
+
+        try:
+            with self._lock:
+                self._write_batch(rows.getvalue(), tombstones)
+        except Exception as e:
+            print(f"Storage commit error: {str(e)}")
+            if self.deduper is not None:
+                for article_id in added:
+                    self.deduper.remove(article_id)
+            for op in pending:
+                if op.kind in ('append', 'delete'):
+                    op.result = None
+                    op.error = e
+        else:
+            self._live_ids.update(added)
+            self._live_ids.difference_update(tombstones)
+            self._tombstones += len(tombstones)
+            if self.deduper is not None:
+                for article_id in tombstones:
+                    self.deduper.remove(article_id)
+            self._notify(inserted, tombstones)
+
+        for op in pending:
+            if op.kind == 'compact':
+                try:
+                    with self._lock:
+                        op.result = self._compact()
+                except Exception as e:
+                    print(f"Compaction error: {str(e)}")
+                    op.error = e
+            elif op.kind == 'stop':
+                stop = True
+
+        for op in pending:
+            op.done.set()
+
+        return stop
+
+    def _write_batch(self, rows, tombstones):
+        """Append rows and tombstones durably, undoing a partial write on error"""
+        path = tombstone_path(self.csv_file)
+        csv_size = os.path.getsize(self.csv_file)
+        tombstone_size = os.path.getsize(path) if os.path.exists(path) else None
+
+        try:
+            if rows:
+                with open(self.csv_file, 'a', newline='', encoding='utf-8') as f:
+                    f.write(rows)
+                    f.flush()
+                    os.fsync(f.fileno())
+            if tombstones:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(f'{article_id}\n' for article_id in tombstones))
+                    f.flush()
+                    os.fsync(f.fileno())
+        except Exception:
+            _truncate(self.csv_file, csv_size)
+            _truncate(path, tombstone_size)
+            raise
+
+    def _notify(self, inserted, deleted):
+        """Tell listeners about a committed batch"""
+        for listener in self.listeners:
+            try:
+                for article_id, article in inserted:
+                    listener.on_insert(article_id, article)
+                for article_id in deleted:
+                    listener.on_delete(article_id)
+            except Exception as e:
+                print(f"Storage listener error: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def _compactor_loop(self):
+        """Periodically ask the writer to compact when tombstones pile up"""
+        while not self._stopping.wait(self.compact_interval):
+            if self._tombstones >= COMPACT_MIN_TOMBSTONES:
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"Compaction error: {str(e)}")
+
+    def _compact(self):
+        """
+        Rewrite the log in canonical column order without deleted rows
+
+        Rows are copied cell by cell with the csv module, not through pandas,
+        so values such as 'NA' or 'null' and integer claps come back exactly
+        as they were written. Must only run on the writer thread (or before
+        it starts).
+
+        Returns:
+            int: Number of rows dropped
+        """
+        deleted = read_tombstones(self.csv_file)
+        live_ids = set()
+        max_id = -1
+
+        tmp_file = self.csv_file + '.tmp'
+        with open(self.csv_file, 'r', newline='', encoding='utf-8') as src, \
+                open(tmp_file, 'w', newline='', encoding='utf-8') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            header = next(reader, [])
+            positions = [header.index(col) if col in header else None for col in COLUMNS]
+            has_id = ID_COLUMN in header
+
+            writer.writerow(COLUMNS)
+            position = 0
+            for row in reader:
+                if not row:
+                    continue
+                if has_id:
+                    article_id = _parse_id(row[positions[0]] if positions[0] < len(row) else '')
+                else:
+                    # Legacy file written before stable IDs: row position is the ID
+                    article_id = position
+                position += 1
+                if article_id is None:
+                    continue
+
+                max_id = max(max_id, article_id)
+                if article_id in deleted:
+                    continue
+                values = [row[i] if i is not None and i < len(row) else '' for i in positions]
+                values[0] = article_id
+                writer.writerow(values)
+                live_ids.add(article_id)
+
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        # Save the next free ID first: the rows that imply it may be dropped
+        self._next_id = max(self._next_id, max_id + 1)
+        _write_next_id(self.csv_file, self._next_id)
+        os.replace(tmp_file, self.csv_file)
+
+        # The tombstones are now baked into the log
+        path = tombstone_path(self.csv_file)
+        if os.path.exists(path):
+            os.remove(path)
+        self._tombstones = 0
+
+        self._live_ids = live_ids
+        return len(deleted)
+
+
+def _truncate(path, size):
+    """Cut a file back to size bytes (remove it if size is None)"""
+    try:
+        if size is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            os.truncate(path, size)
+    except OSError as e:
+        print(f"Error rolling back {path}: {str(e)}")
+
+
+def _parse_id(value):
+    """Parse an ID cell ('6' or pandas' '6.0'), or return None if it is unusable"""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _csv_value(value):
+    """Normalise a scraped value for CSV output"""
+    if value is None:
+        return ''
+    return value
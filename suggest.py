@@ -0,0 +1,241 @@
+"""
+Typeahead Suggestion Module
+Prefix index over titles, keywords and author names
+
+Every suggestion is indexed under each of its word suffixes ("smart cities
+of the future" is also found by "cities" and "future") in one sorted
+array. For each looked-up prefix the index keeps the TOP_K best matches by
+claps, updated in place on insert and delete, so a lookup is a dictionary
+hit; only a prefix seen for the first time (or whose cached list ran
+short) scans its whole key range. Prefixes of up to three characters, the
+most common while typing, are computed when the index is built.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+from fields import clean_field, safe_int
+
+# Suggestion kinds, in tie-break order
+KIND_ORDER = {'title': 0, 'keyword': 1, 'author': 2}
+
+MAX_INDEXED_WORDS = 12   # Suffixes indexed per suggestion
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 50           # Largest limit a lookup may ask for
+TOP_K = 2 * MAX_LIMIT    # Matches kept per prefix (slack for deletes)
+WARM_PREFIX_LENGTH = 3   # Prefixes up to this length are computed on rebuild
+MAX_PREFIXES = 20000     # Cached longer prefixes before they are dropped
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize(text):
+    """Lowercase and reduce punctuation/whitespace to single spaces"""
+    return _NON_WORD_RE.sub(' ', str(text).lower()).strip()
+
+
+def _article_suggestions(article):
+    """Return the (kind, text) suggestions an article contributes"""
+    suggestions = []
+    title = clean_field(article.get('Title', ''))
+    if title:
+        suggestions.append(('title', title))
+    for keyword in clean_field(article.get('Keywords', '')).split(','):
+        keyword = keyword.strip()
+        if keyword:
+            suggestions.append(('keyword', keyword))
+    author = clean_field(article.get('Author Name', ''))
+    if author:
+        suggestions.append(('author', author))
+    return suggestions
+
+
+def _suffix_keys(text):
+    """Index keys for a suggestion: the normalized text from each word on"""
+    words = normalize(text).split()[:MAX_INDEXED_WORDS]
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class SuggestIndex:
+    """Sorted-array prefix index, safe to query while the writer updates it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []          # sorted (key, kind, text)
+        self._suggestions = {}   # (kind, text) -> {article_id: claps}
+        self._totals = {}        # (kind, text) -> summed claps
+        self._articles = {}      # article_id -> [(kind, text), ...]
+        # prefix -> [best (kind, text) first, whole range listed?]; each
+        # list is always the exact top len(list) matches of its prefix
+        self._top = {}
+
+    def _rank(self, suggestion):
+        return (-self._totals[suggestion], KIND_ORDER[suggestion[0]], suggestion[1].lower())
+
+    # ------------------------------------------------------------------
+    # Storage listener interface
+    # ------------------------------------------------------------------
+
+    def rebuild(self, df):
+        """Index every stored article (one sort instead of many inserts)"""
+        with self._lock:
+            self._keys = []
+            self._suggestions = {}
+            self._totals = {}
+            self._articles = {}
+            for article_id, row in df.iterrows():
+                self._add(int(article_id), row, self._keys.append)
+            self._keys.sort()
+
+            # Short prefixes in one pass over the keys
+            buckets = {}
+            for key, kind, text in self._keys:
+                for n in range(1, min(WARM_PREFIX_LENGTH, len(key)) + 1):
+                    buckets.setdefault(key[:n], set()).add((kind, text))
+            self._top = {prefix: self._best(matches) for prefix, matches in buckets.items()}
+
+    def on_insert(self, article_id, article):
+        with self._lock:
+            self._add(article_id, article, lambda entry: insort(self._keys, entry), self._promote)
+
+    def on_delete(self, article_id):
+        with self._lock:
+            for suggestion in self._articles.pop(article_id, []):
+                articles = self._suggestions.get(suggestion)
+                if articles is None:
+                    continue
+                self._totals[suggestion] -= articles.pop(article_id, 0)
+                if articles:
+                    self._demote(suggestion, removed=False)
+                    continue
+
+                # Last article with this suggestion: drop it and its keys
+                self._demote(suggestion, removed=True)
+                del self._suggestions[suggestion]
+                del self._totals[suggestion]
+                kind, text = suggestion
+                for key in _suffix_keys(text):
+                    entry = (key, kind, text)
+                    i = bisect_left(self._keys, entry)
+                    if i < len(self._keys) and self._keys[i] == entry:
+                        del self._keys[i]
+
+    def _add(self, article_id, article, add_key, changed=None):
+        """Index an article's suggestions, calling changed() as each total moves"""
+        claps = safe_int(article.get('Number of Claps', 0))
+        suggestions = _article_suggestions(article)
+        self._articles[article_id] = suggestions
+        for kind, text in suggestions:
+            suggestion = (kind, text)
+            if suggestion not in self._suggestions:
+                self._suggestions[suggestion] = {}
+                self._totals[suggestion] = 0
+                for key in _suffix_keys(text):
+                    add_key((key, kind, text))
+            articles = self._suggestions[suggestion]
+            self._totals[suggestion] += claps - articles.get(article_id, 0)
+            articles[article_id] = claps
+            if changed is not None:
+                changed(suggestion)
+
+    # ------------------------------------------------------------------
+    # Per-prefix top lists
+    # ------------------------------------------------------------------
+
+    def _cached_prefixes(self, suggestion):
+        """Yield the cached top lists whose prefix matches the suggestion"""
+        seen = set()
+        for key in _suffix_keys(suggestion[1]):
+            for n in range(1, len(key) + 1):
+                prefix = key[:n]
+                if prefix not in seen:
+                    seen.add(prefix)
+                    entry = self._top.get(prefix)
+                    if entry is not None:
+                        yield entry
+
+    def _promote(self, suggestion):
+        """Move a new or gained-claps suggestion into the lists it now belongs in"""
+        rank = self._rank(suggestion)
+        for entry in self._cached_prefixes(suggestion):
+            top, complete = entry
+            if suggestion in top:
+                top.remove(suggestion)
+            elif not complete and (not top or rank > self._rank(top[-1])):
+                continue  # Unlisted matches may rank above it
+            i = bisect_left([self._rank(s) for s in top], rank)
+            top.insert(i, suggestion)
+            if len(top) > TOP_K:
+                top.pop()
+                entry[1] = False
+
+    def _demote(self, suggestion, removed):
+        """Update the lists of a suggestion that lost claps or was removed"""
+        for entry in self._cached_prefixes(suggestion):
+            top, complete = entry
+            if suggestion not in top:
+                continue
+            top.remove(suggestion)
+            if removed:
+                continue
+            rank = self._rank(suggestion)
+            if complete or (top and rank <= self._rank(top[-1])):
+                i = bisect_left([self._rank(s) for s in top], rank)
+                top.insert(i, suggestion)
+            # Otherwise unlisted matches may now rank above it: leave it out
+
+    def _best(self, matches):
+        """Build a top list entry from every suggestion matching a prefix"""
+        return [heapq.nsmallest(TOP_K, matches, key=self._rank), len(matches) <= TOP_K]
+
+    def _scan(self, prefix):
+        """Collect every suggestion whose key starts with the prefix"""
+        matches = set()
+        i = bisect_left(self._keys, (prefix,))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+            matches.add(self._keys[i][1:])
+            i += 1
+        return self._best(matches)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT):
+        """
+        Return up to limit suggestions whose words start with the prefix
+
+        Returns:
+            list: Dicts with text, type, claps, articles and, for titles,
+                the article_id of the most clapped article
+        """
+        prefix = normalize(prefix)
+        limit = min(limit, MAX_LIMIT)
+        if not prefix:
+            return []
+
+        with self._lock:
+            entry = self._top.get(prefix)
+            if entry is None or (len(entry[0]) < limit and not entry[1]):
+                if entry is None and len(self._top) >= MAX_PREFIXES:
+                    self._top = {p: e for p, e in self._top.items() if len(p) <= WARM_PREFIX_LENGTH}
+                entry = self._top[prefix] = self._scan(prefix)
+
+            results = []
+            for kind, text in entry[0][:limit]:
+                articles = self._suggestions[(kind, text)]
+                result = {
+                    'text': text,
+                    'type': kind,
+                    'claps': self._totals[(kind, text)],
+                    'articles': len(articles),
+                }
+                if kind == 'title':
+                    result['article_id'] = max(articles, key=lambda a: (articles[a], -a))
+                results.append(result)
+        return results
+
+    def __len__(self):
+        return len(self._keys)
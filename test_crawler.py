@@ -0,0 +1,131 @@
+"""
+Tests for the tag/author page crawler against a small local site
+
+Run with: python -m pytest -q
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+from crawler import Crawler
+from storage import ArticleStore, read_articles
+
+# Links of each page; pages under /a/ are articles, the rest listings.
+# 'OFFSITE' is replaced by the same server under a host that is not allowed.
+SITE = {
+    '/tag/start': ['/a/one', '/@alice', 'OFFSITE/a/offsite'],
+    '/a/one': ['/tag/deep'],
+    '/@alice': ['/a/two', '/a/moved'],
+    '/a/two': [],
+    '/tag/deep': ['/a/three'],
+    '/a/three': [],
+    '/a/offsite': [],
+}
+REDIRECTS = {'/a/moved': 'OFFSITE/a/two'}
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.headers['Host'].split(':')[0], self.path))
+        offsite = f'http://127.0.0.1:{self.server.server_port}'
+
+        if self.path in REDIRECTS:
+            self.send_response(302)
+            self.send_header('Location', REDIRECTS[self.path].replace('OFFSITE', offsite))
+            self.end_headers()
+            return
+        if self.path not in SITE:
+            self.send_error(404)
+            return
+
+        links = ''.join(
+            f'<a href="{link.replace("OFFSITE", offsite)}">{link}</a>' for link in SITE[self.path]
+        )
+        body = f'<html><body><h1>{self.path}</h1><article><p>Text of {self.path}</p>{links}</article></body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArticleStore(str(tmp_path / 'articles.csv'), compact_interval=0).start()
+    yield store
+    store.stop()
+
+
+def make_crawler(store, site, **kwargs):
+    kwargs.setdefault('allowed_domains', ['localhost'])
+    return Crawler(store, delay=0, checkpoint=None, **kwargs)
+
+
+def seed(site):
+    return f'http://localhost:{site.server_port}/tag/start'
+
+
+def stored_paths(store):
+    return sorted(urlsplit(url).path for url in read_articles(store.csv_file)['URL'])
+
+
+def test_depth_and_domain_limits(site, store):
+    crawler = make_crawler(store, site, max_depth=2, max_pages=0)
+    crawler.add_seeds([seed(site)])
+    crawler.run()
+
+    fetched = [path for host, path in site.requests if host == 'localhost']
+    assert sorted(fetched) == ['/@alice', '/a/moved', '/a/one', '/a/two', '/tag/deep', '/tag/start']
+    # Off-domain links are never queued; a redirect off-domain is not stored
+    assert ('127.0.0.1', '/a/offsite') not in site.requests
+    assert stored_paths(store) == ['/a/one', '/a/two']
+    assert crawler.stats['articles'] == 2
+    assert crawler.stats['errors'] == 1
+
+
+def test_max_pages(site, store):
+    crawler = make_crawler(store, site, max_depth=5, max_pages=3)
+    crawler.add_seeds([seed(site)])
+    stats = crawler.run()
+
+    assert stats['pages'] == 3
+    assert len(site.requests) == 3
+    assert crawler.frontier
+
+
+def test_resume_applies_current_limits(site, store, tmp_path):
+    checkpoint = str(tmp_path / 'crawl_state.json')
+    first = make_crawler(store, site, allowed_domains=['localhost', '127.0.0.1'], max_depth=5, max_pages=2)
+    first.checkpoint = checkpoint
+    first.add_seeds([seed(site)])
+    first.run()
+    assert [path for _, path in site.requests] == ['/tag/start', '/a/one']
+    assert {urlsplit(url).path for _, _, url, _ in first.frontier} == {'/@alice', '/a/offsite', '/tag/deep'}
+
+    # Resuming with stricter limits drops the off-domain and too-deep entries
+    site.requests.clear()
+    resumed = make_crawler(store, site, max_depth=1, max_pages=10)
+    resumed.checkpoint = checkpoint
+    assert resumed.load_checkpoint()
+    assert [urlsplit(url).path for _, _, url, _ in resumed.frontier] == ['/@alice']
+
+    stats = resumed.run()
+    assert site.requests == [('localhost', '/@alice')]
+    assert stats['pages'] == 3
+    assert stored_paths(store) == ['/a/one']
@@ -0,0 +1,167 @@
+"""
+Tests for the single-writer article store
+
+Run with: python -m pytest -q
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+
+import storage
+from storage import ArticleStore, read_articles
+
+
+def fail_fsync(fd):
+    raise OSError('disk full')
+
+
+def make_article(n):
+    return {'Title': f'Article {n}', 'Full Text': f'Body of article {n}', 'Number of Claps': n}
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    return str(tmp_path / 'articles.csv')
+
+
+def test_ids_survive_restart(csv_file):
+    store = ArticleStore(csv_file, compact_interval=0).start()
+    ids = store.append([make_article(n) for n in range(3)])
+    store.stop()
+
+    store = ArticleStore(csv_file, compact_interval=0).start()
+    try:
+        assert store.append([make_article(3)]) == [ids[-1] + 1]
+        assert list(read_articles(csv_file).index) == ids + [ids[-1] + 1]
+    finally:
+        store.stop()
+
+
+def test_deleted_id_is_not_reused_after_compaction(csv_file):
+    store = ArticleStore(csv_file, compact_interval=0).start()
+    store.append([make_article(n) for n in range(7)])
+    assert store.delete(6)
+    store.compact()
+    store.stop()
+
+    store = ArticleStore(csv_file, compact_interval=0).start()
+    try:
+        assert store.append([make_article(7)]) == [7]
+        assert 6 not in read_articles(csv_file).index
+    finally:
+        store.stop()
+
+
+def test_concurrent_appends_and_deletes(csv_file):
+    store = ArticleStore(csv_file, compact_interval=0).start()
+    results = []
+    results_lock = threading.Lock()
+
+    def worker(worker_id):
+        for n in range(25):
+            ids = store.append([make_article(worker_id * 100 + n)])
+            if n % 5 == 0:
+                assert store.delete(ids[0])
+            else:
+                with results_lock:
+                    results.extend(ids)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    try:
+        df = read_articles(csv_file)
+        assert len(results) == len(set(results)) == 8 * 20
+        assert sorted(df.index) == sorted(results)
+        assert all(store.exists(article_id) for article_id in results)
+
+        store.compact()
+        assert sorted(read_articles(csv_file).index) == sorted(results)
+    finally:
+        store.stop()
+
+
+def test_failed_commit_leaves_no_phantom_ids(csv_file, monkeypatch):
+    store = ArticleStore(csv_file, compact_interval=0).start()
+    try:
+        store.append([make_article(0)])
+
+        monkeypatch.setattr(storage.os, 'fsync', fail_fsync)
+        with pytest.raises(OSError):
+            store.append([make_article(1)])
+        monkeypatch.undo()
+
+        # The failed row is neither live nor on disk, and its ID is not reused
+        assert not store.exists(1)
+        assert store.delete(1) is False
+        assert list(read_articles(csv_file).index) == [0]
+        assert store.append([make_article(2)]) == [2]
+        assert list(read_articles(csv_file).index) == [0, 2]
+    finally:
+        store.stop()
+
+
+def test_failed_commit_rolls_back_deduper(csv_file, monkeypatch):
+    from dedupe import Deduplicator
+
+    text = ' '.join(f'word{i}' for i in range(60))
+    store = ArticleStore(csv_file, compact_interval=0, deduper=Deduplicator(mode='flag')).start()
+    try:
+        monkeypatch.setattr(storage.os, 'fsync', fail_fsync)
+        with pytest.raises(OSError):
+            store.append([{'Title': 'First', 'Full Text': text}])
+        monkeypatch.undo()
+
+        article = {'Title': 'Second', 'Full Text': text}
+        article_id = store.append([article])[0]
+        assert article.get(storage.DUPLICATE_OF_COLUMN) is None
+        assert pd.isna(read_articles(csv_file).loc[article_id, storage.DUPLICATE_OF_COLUMN])
+    finally:
+        store.stop()
+
+
+def test_duplicate_of_reads_back_as_integer(csv_file):
+    from dedupe import Deduplicator
+
+    text = ' '.join(f'word{i}' for i in range(60))
+    store = ArticleStore(csv_file, compact_interval=0, deduper=Deduplicator(mode='flag')).start()
+    try:
+        first, copy = store.append([{'Title': 'First', 'Full Text': text}, {'Title': 'Copy', 'Full Text': text}])
+        store.compact()
+
+        df = read_articles(csv_file)
+        assert str(df[storage.DUPLICATE_OF_COLUMN].dtype) == 'Int64'
+        assert df.loc[copy, storage.DUPLICATE_OF_COLUMN] == first
+        assert pd.isna(df.loc[first, storage.DUPLICATE_OF_COLUMN])
+        assert f',{first}\n' in open(csv_file, encoding='utf-8').read()
+    finally:
+        store.stop()
+
+
+def test_compaction_keeps_values_verbatim(csv_file):
+    import csv
+
+    store = ArticleStore(csv_file, compact_interval=0).start()
+    try:
+        kept, _, empty_claps = store.append([
+            {'Title': 'NA', 'Subtitle': 'None', 'Full Text': 'null', 'Keywords': 'N/A', 'Number of Claps': 5},
+            make_article(1),
+            {'Title': 'No claps', 'Full Text': 'Body', 'Number of Claps': None},
+        ])
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            before = [row for row in csv.reader(f) if row[0] != '1']
+
+        assert store.delete(1)
+        store.compact()
+
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            assert list(csv.reader(f)) == before
+        assert sorted(read_articles(csv_file).index) == [kept, empty_claps]
+        assert store.append([make_article(3)]) == [3]
+    finally:
+        store.stop()
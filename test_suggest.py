@@ -0,0 +1,82 @@
+"""
+Tests for the typeahead suggestion index
+
+Run with: python -m pytest -q
+"""
+
+import random
+
+import pandas as pd
+
+import suggest
+from fields import safe_int
+from suggest import KIND_ORDER, SuggestIndex, _article_suggestions, _suffix_keys, normalize
+
+WORDS = 'data dz dot apple apricot ant bee be'.split()
+
+
+def expected_suggestions(articles, prefix, limit):
+    """Rank every matching suggestion from scratch"""
+    prefix = normalize(prefix)
+    totals = {}
+    for article in articles.values():
+        for suggestion in _article_suggestions(article):
+            totals[suggestion] = totals.get(suggestion, 0) + safe_int(article.get('Number of Claps', 0))
+    matches = [s for s in totals if any(key.startswith(prefix) for key in _suffix_keys(s[1]))]
+    matches.sort(key=lambda s: (-totals[s], KIND_ORDER[s[0]], s[1].lower()))
+    return [(text, kind, totals[(kind, text)]) for kind, text in matches[:limit]]
+
+
+def as_tuples(results):
+    return [(r['text'], r['type'], r['claps']) for r in results]
+
+
+def test_short_prefix_ranks_by_claps():
+    rows = [{'Title': f'data a{i:04d}', 'Number of Claps': 1} for i in range(400)]
+    rows.append({'Title': 'dz most popular', 'Number of Claps': 100000})
+
+    index = SuggestIndex()
+    index.rebuild(pd.DataFrame(rows))
+    assert index.suggest('d', 3)[0]['text'] == 'dz most popular'
+
+    # Same corpus built one insert at a time
+    index = SuggestIndex()
+    index.rebuild(pd.DataFrame())
+    for article_id, row in enumerate(rows):
+        index.on_insert(article_id, row)
+    assert index.suggest('d', 3)[0]['text'] == 'dz most popular'
+    assert index.suggest('data a', 1)[0]['text'] == 'data a0000'
+
+
+def test_incremental_updates_match_full_ranking(monkeypatch):
+    # A small TOP_K makes the cached lists overflow and run short
+    monkeypatch.setattr(suggest, 'TOP_K', 6)
+    rng = random.Random(3)
+
+    def make_article():
+        return {
+            'Title': ' '.join(rng.choices(WORDS, k=3)),
+            'Keywords': ', '.join(rng.sample(WORDS, 2)),
+            'Author Name': rng.choice(['Ann', 'Andy', 'Bob']),
+            'Number of Claps': rng.randint(0, 100),
+        }
+
+    for _ in range(20):
+        articles = {article_id: make_article() for article_id in range(20)}
+        index = SuggestIndex()
+        index.rebuild(pd.DataFrame.from_dict(articles, orient='index'))
+        next_id = len(articles)
+
+        for _ in range(150):
+            if rng.random() < 0.5 or not articles:
+                articles[next_id] = make_article()
+                index.on_insert(next_id, articles[next_id])
+                next_id += 1
+            else:
+                article_id = rng.choice(list(articles))
+                del articles[article_id]
+                index.on_delete(article_id)
+
+            prefix = rng.choice(['d', 'da', 'a', 'an', 'b', 'be', 'data d', 'ap', 'x', 'dot a'])
+            limit = rng.choice([1, 3, 5])
+            assert as_tuples(index.suggest(prefix, limit)) == expected_suggestions(articles, prefix, limit)
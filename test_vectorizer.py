@@ -0,0 +1,96 @@
+"""
+Tests for the hashed TF-IDF index
+
+Run with: python -m pytest -q
+"""
+
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+import vectorizer
+from vectorizer import HashingIndex, combined_text
+
+ARTICLES = {
+    0: {'Title': 'Python for data science', 'Full Text': 'pandas numpy python notebooks', 'Number of Claps': 10},
+    1: {'Title': 'Smart cities', 'Full Text': 'urban sensors and traffic data', 'Number of Claps': 5},
+    2: {'Title': 'Learning Rust', 'Full Text': 'ownership borrowing and lifetimes', 'Number of Claps': 7},
+}
+
+
+@pytest.fixture(autouse=True)
+def simple_preprocess(monkeypatch):
+    # Avoid needing NLTK data: lowercase and split only
+    monkeypatch.setattr(vectorizer, 'preprocess_text', lambda text: ' '.join(str(text).lower().split()))
+
+
+def tfidf_similarities(articles, query):
+    """Similarities (percent) from the TF-IDF ranker's formula"""
+    ids = list(articles)
+    texts = [combined_text(articles[article_id]) for article_id in ids]
+    tfidf = TfidfVectorizer(ngram_range=(1, 2), min_df=1)
+    matrix = tfidf.fit_transform(texts)
+    scores = cosine_similarity(tfidf.transform([query.lower()]), matrix)[0]
+    return {article_id: round(score * 100, 2) for article_id, score in zip(ids, scores) if score > 0}
+
+
+@pytest.mark.parametrize('query', ['python', 'python java', 'smart cities data', 'unknownterm data'])
+def test_similarity_matches_tfidf(query):
+    index = HashingIndex()
+    index.rebuild(pd.DataFrame.from_dict(ARTICLES, orient='index'))
+    results = {r['article_id']: r['similarity'] for r in index.search(query)}
+    assert results == tfidf_similarities(ARTICLES, query)
+
+
+def test_inserts_and_deletes_need_no_rebuild():
+    index = HashingIndex()
+    index.rebuild(pd.DataFrame.from_dict({0: ARTICLES[0]}, orient='index'))
+
+    for article_id in (1, 2):
+        article = dict(ARTICLES[article_id])
+        index.prepare(article)
+        index.on_insert(article_id, article)
+    assert index.num_docs == 3
+    assert {r['article_id']: r['similarity'] for r in index.search('smart cities data')} == \
+        tfidf_similarities(ARTICLES, 'smart cities data')
+
+    index.on_delete(1)
+    remaining = {k: v for k, v in ARTICLES.items() if k != 1}
+    assert index.num_docs == 2
+    assert {r['article_id']: r['similarity'] for r in index.search('smart cities data')} == \
+        tfidf_similarities(remaining, 'smart cities data')
+
+
+@pytest.mark.parametrize('full_norms_min_rows', [1, 256])
+def test_scores_stay_exact_across_folds(monkeypatch, full_norms_min_rows):
+    # Inserts and deletes in separate folds exercise block merges and compaction
+    monkeypatch.setattr(vectorizer, 'FULL_NORMS_MIN_ROWS', full_norms_min_rows)
+    articles = {
+        n: {'Title': f'Post {n} about {topic}', 'Full Text': f'{topic} notes number {n % 3}', 'Number of Claps': n}
+        for n, topic in enumerate(['python data', 'rust', 'data cities', 'python'] * 5)
+    }
+    index = HashingIndex()
+    index.rebuild(pd.DataFrame.from_dict({0: articles[0]}, orient='index'))
+    live = {0: articles[0]}
+
+    for article_id in range(1, len(articles)):
+        article = dict(articles[article_id])
+        index.prepare(article)
+        index.on_insert(article_id, article)
+        live[article_id] = articles[article_id]
+        if article_id % 3 == 0:
+            index.on_delete(article_id - 2)
+            del live[article_id - 2]
+        results = {r['article_id']: r['similarity'] for r in index.search('python data', top_n=len(articles))}
+        assert results == tfidf_similarities(live, 'python data')
+    assert index.num_docs == len(live)
+
+
+@pytest.mark.parametrize('n_features', [2 ** 20, 16])
+def test_local_columns_keep_only_used_columns(n_features):
+    index = HashingIndex(n_features)
+    matrix = index.vectorize([combined_text(article) for article in ARTICLES.values()]).tocsr()
+    columns, vocab = vectorizer._local_columns(matrix)
+    assert list(vocab) == sorted(set(matrix.indices))
+    assert (columns.toarray() == matrix.toarray()[:, vocab]).all()
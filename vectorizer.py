@@ -0,0 +1,385 @@
+"""
+Hashing Vectorizer Module
+TF-IDF search with a hashed feature space and incrementally kept IDF
+
+The TF-IDF ranker fits a vocabulary on the whole corpus for every search
+and keeps only the 5000 most frequent terms. Here terms are hashed into a
+fixed number of columns instead, so every document can be vectorized on its
+own: new articles are appended without a refit, no term is dropped, and
+the vocabulary costs n_features counters however many terms the corpus
+has. Articles are vectorized in the request thread (prepare); the writer
+only queues them, and the first search after a change folds the queue into
+a new block and new document frequencies.
+"""
+
+import math
+import os
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from fields import clean_field, safe_int
+from scraper import preprocess_text
+
+# Configuration (from environment variables)
+HASHING_FEATURES = int(os.environ.get('HASHING_FEATURES', str(2 ** 20)))
+
+# Blocks with at least this many rows compute all their norms in one pass
+# when a search matches most of them (smaller ones always go row by row)
+FULL_NORMS_MIN_ROWS = 256
+
+
+def combined_text(article):
+    """
+    Build the preprocessed text the TF-IDF ranker indexes for an article
+
+    Returns:
+        str: Preprocessed text, or '' if the article has no title or body
+    """
+    title = clean_field(article.get('Title', ''))
+    body = clean_field(article.get('Full Text', ''))
+    if not title or not body:
+        return ''
+    keywords = clean_field(article.get('Keywords', ''))
+    subtitle = clean_field(article.get('Subtitle', ''))
+    # Title and keywords count double, as in search_similar_articles
+    return preprocess_text(' '.join([title, title, keywords, keywords, subtitle, body]))
+
+
+class _Block:
+    """Immutable run of indexed articles: raw term counts plus result metadata"""
+
+    def __init__(self, matrix, ids, rows, columns=None):
+        self.matrix = matrix  # CSR over all hash columns, for norms of a few rows
+        # CSC over only the hash columns this block uses (self.vocab), for query postings
+        self.columns, self.vocab = columns if columns is not None else _local_columns(matrix)
+        self.ids = ids        # row -> article ID (None once deleted)
+        self.rows = rows      # row -> result metadata
+        self.live = np.array([article_id is not None for article_id in ids], dtype=bool)
+        self.num_live = int(self.live.sum())
+        self.positions = {article_id: i for i, article_id in enumerate(ids) if article_id is not None}
+        self._squares = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def local(self, columns):
+        """Return (mask of columns this block uses, their positions in self.columns)"""
+        if not len(self.vocab):
+            return np.zeros(len(columns), dtype=bool), columns[:0]
+        positions = np.searchsorted(self.vocab, columns).clip(max=len(self.vocab) - 1)
+        found = self.vocab[positions] == columns
+        return found, positions[found]
+
+    def dots(self, local, weights):
+        """Dot product of every row with a query given on local columns"""
+        indptr = self.columns.indptr
+        starts = indptr[local]
+        lengths = indptr[local + 1] - starts
+        # Positions of the query columns' entries, one column after another
+        postings = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return np.bincount(
+            self.columns.indices[postings],
+            weights=self.columns.data[postings] * np.repeat(weights, lengths),
+            minlength=len(self),
+        )
+
+    def squares(self):
+        """Squared counts laid out like self.columns (columns self.vocab)"""
+        if self._squares is None:
+            self._squares = sp.csc_matrix(
+                (self.columns.data.astype(np.float64) ** 2, self.columns.indices, self.columns.indptr),
+                shape=self.columns.shape,
+            )
+        return self._squares
+
+    def terms(self, article_id):
+        """Hash columns of an article's row"""
+        i = self.positions[article_id]
+        return self.matrix.indices[self.matrix.indptr[i]:self.matrix.indptr[i + 1]]
+
+    def without(self, article_ids):
+        """Return a copy with the given articles deleted"""
+        ids, rows = list(self.ids), list(self.rows)
+        for article_id in article_ids:
+            i = self.positions[article_id]
+            ids[i] = rows[i] = None
+        block = _Block(self.matrix, ids, rows, (self.columns, self.vocab))
+        # Drop deleted rows once they make up half the block
+        return _merge([block]) if block.num_live * 2 < len(block) else block
+
+
+def _local_columns(matrix):
+    """CSC copy of a CSR matrix restricted to its non-empty columns, and those columns"""
+    if matrix.nnz < matrix.shape[1]:
+        # Small blocks: avoid an index pointer over the whole hash space
+        vocab, local = np.unique(matrix.indices, return_inverse=True)
+        matrix = sp.csr_matrix((matrix.data, local.astype(np.int32), matrix.indptr), shape=(matrix.shape[0], len(vocab)))
+        return matrix.tocsc(), vocab
+    columns = matrix.tocsc()
+    vocab = np.flatnonzero(np.diff(columns.indptr))
+    indptr = np.append(columns.indptr[vocab], columns.nnz)
+    return sp.csc_matrix((columns.data, columns.indices, indptr), shape=(matrix.shape[0], len(vocab))), vocab
+
+
+def _merge(blocks):
+    """Concatenate the live rows of blocks into one block"""
+    matrices, ids, rows = [], [], []
+    for block in blocks:
+        live = np.flatnonzero(block.live)
+        matrices.append(block.matrix if len(live) == len(block) else block.matrix[live])
+        ids += [block.ids[i] for i in live]
+        rows += [block.rows[i] for i in live]
+    return _Block(sp.vstack(matrices, format='csr'), ids, rows)
+
+
+class _Snapshot:
+    """
+    Immutable state a search reads: blocks of documents and document frequencies
+
+    Inserts arrive as a new block that is merged with the blocks before it
+    while those are no bigger, so there are O(log n) blocks and folding in a
+    change costs amortized O(log n) per new document instead of a copy of the
+    whole matrix. IDF depends on the document count, so document norms are
+    not stored: a search computes them for the rows it matched and keeps
+    them for later searches on the same snapshot.
+    """
+
+    def __init__(self, n_features, blocks=(), doc_freq=None):
+        self.blocks = list(blocks)
+        if doc_freq is None:
+            doc_freq = np.zeros(n_features, dtype=np.int32)
+            for block in self.blocks:
+                doc_freq += np.bincount(block.matrix.indices, minlength=n_features).astype(np.int32)
+        self.doc_freq = doc_freq
+        self.num_docs = sum(block.num_live for block in self.blocks)
+        self._norms = [None] * len(self.blocks)
+
+    def idf(self, columns):
+        """Smoothed IDF of hash columns, as TfidfVectorizer computes it"""
+        return np.log((1 + self.num_docs) / (1 + self.doc_freq[columns])) + 1
+
+    def norms(self, b, rows):
+        """IDF-weighted norms of rows of block b, computed on first use"""
+        block = self.blocks[b]
+        if self._norms[b] is None:
+            self._norms[b] = np.full(len(block), np.nan)
+        norms = self._norms[b]
+        missing = rows[np.isnan(norms[rows])]
+        if len(block) >= FULL_NORMS_MIN_ROWS and len(missing) * 4 > len(block):
+            # Most of a large block: one pass over its columns beats slicing rows
+            idf = self.idf(block.vocab)
+            norms[:] = np.sqrt(block.squares() @ (idf * idf))
+        elif len(missing):
+            sub = block.matrix[missing]
+            weighted = sub.data * self.idf(sub.indices)
+            # Matched rows are never empty, so reduceat sums each row
+            norms[missing] = np.sqrt(np.add.reduceat(weighted * weighted, sub.indptr[:-1]))
+        return norms[rows]
+
+    def updated(self, pending, removed):
+        """Return a new snapshot with pending inserts and removed IDs applied"""
+        blocks = list(self.blocks)
+        doc_freq = self.doc_freq.copy()
+
+        if removed:
+            for b, block in enumerate(blocks):
+                gone = [article_id for article_id in removed if article_id in block.positions]
+                if gone:
+                    for article_id in gone:
+                        doc_freq[block.terms(article_id)] -= 1
+                    blocks[b] = block.without(gone)
+            blocks = [block for block in blocks if block.num_live]
+
+        if pending:
+            block = _Block(
+                sp.vstack([vector for _, _, vector in pending], format='csr'),
+                [article_id for article_id, _, _ in pending],
+                [row for _, row, _ in pending],
+            )
+            np.add.at(doc_freq, block.matrix.indices, 1)
+            while blocks and len(blocks[-1]) <= len(block):
+                block = _merge([blocks.pop(), block])
+            blocks.append(block)
+
+        return _Snapshot(doc_freq.shape[0], blocks, doc_freq)
+
+
+class HashingIndex:
+    """
+    Hashed TF-IDF index over articles, safe to query while the writer updates it
+
+    The writer only queues inserts and deletes; the first search after a
+    change folds them into a new snapshot outside the writer's lock.
+
+    Args:
+        n_features: Number of hash columns (memory for IDF statistics is
+            fixed at one counter per column)
+    """
+
+    def __init__(self, n_features=HASHING_FEATURES):
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm=None,
+            lowercase=False,  # preprocess_text already lowercases
+        )
+        self._lock = threading.Lock()          # guards the queues below (writer)
+        self._refresh_lock = threading.Lock()  # one snapshot rebuild at a time
+        self._pending = []   # (article_id, result row, vector) inserted since the snapshot
+        self._removed = set()
+        self._snapshot = _Snapshot(n_features)
+
+    @property
+    def num_docs(self):
+        return self._current().num_docs
+
+    def vectorize(self, texts):
+        """Hash preprocessed texts into raw term counts (one row per text)"""
+        return self.vectorizer.transform(texts).astype(np.float32)
+
+    # ------------------------------------------------------------------
+    # Storage listener interface
+    # ------------------------------------------------------------------
+
+    def prepare(self, article):
+        """Attach the article's hashed vector (runs in the caller's thread)"""
+        text = combined_text(article)
+        article['_hashed'] = self.vectorize([text]) if text else None
+
+    def rebuild(self, df):
+        """Index every stored article in one batch"""
+        ids, rows, texts = [], [], []
+        for article_id, row in df.iterrows():
+            text = combined_text(row)
+            if text:
+                ids.append(int(article_id))
+                rows.append(_result_row(row))
+                texts.append(text)
+
+        snapshot = _Snapshot(self.n_features, [_Block(self.vectorize(texts), ids, rows)] if texts else [])
+        with self._refresh_lock:
+            with self._lock:
+                self._pending = []
+                self._removed = set()
+            self._snapshot = snapshot
+
+    def on_insert(self, article_id, article):
+        if '_hashed' not in article:
+            self.prepare(article)
+        vector = article['_hashed']
+        if vector is None:
+            return
+        with self._lock:
+            self._pending.append((article_id, _result_row(article), vector))
+
+    def on_delete(self, article_id):
+        with self._lock:
+            self._removed.add(article_id)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _current(self):
+        """Return the snapshot, folding in queued changes first"""
+        with self._lock:
+            if not self._pending and not self._removed:
+                return self._snapshot
+
+        with self._refresh_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                removed, self._removed = self._removed, set()
+            if pending or removed:
+                self._snapshot = self._snapshot.updated(pending, removed)
+            return self._snapshot
+
+    def search(self, query, top_n=10):
+        """
+        Rank articles by cosine similarity of their TF-IDF vectors to the query
+
+        Returns:
+            list: Same result dictionaries as search_similar_articles
+        """
+        try:
+            processed_query = preprocess_text(query)
+            if not processed_query.strip():
+                return []
+            query_vector = self.vectorize([processed_query])
+            if query_vector.nnz == 0:
+                return []
+
+            snapshot = self._current()
+            if snapshot.num_docs == 0:
+                return []
+
+            # Terms no document contains are ignored, as TfidfVectorizer does
+            present = snapshot.doc_freq[query_vector.indices] > 0
+            columns = query_vector.indices[present]
+            idf = snapshot.idf(columns)
+            weights = query_vector.data[present] * idf
+            query_norm = math.sqrt(float(np.dot(weights, weights)))
+            if query_norm == 0:
+                return []
+
+            scores, blocks, rows = [], [], []
+            for b, block in enumerate(snapshot.blocks):
+                found, local = block.local(columns)
+                if not len(local):
+                    continue
+                dots = block.dots(local, (weights * idf)[found])
+                matched = np.flatnonzero(dots > 0)
+                matched = matched[block.live[matched]]
+                if len(matched):
+                    scores.append(dots[matched] / (snapshot.norms(b, matched) * query_norm))
+                    blocks.append(np.full(len(matched), b))
+                    rows.append(matched)
+            if not scores:
+                return []
+
+            scores = np.concatenate(scores)
+            candidates = np.arange(len(scores))
+            if len(candidates) > top_n:
+                candidates = np.argpartition(-scores, top_n - 1)[:top_n]
+            hits = [
+                (float(scores[k]), snapshot.blocks[b], i)
+                for k, b, i in zip(candidates, np.concatenate(blocks)[candidates], np.concatenate(rows)[candidates])
+            ]
+            hits.sort(key=lambda hit: (-hit[0], -hit[1].rows[hit[2]]['claps']))
+
+            return [
+                dict(block.rows[i], article_id=block.ids[i], similarity=round(score * 100, 2))
+                for score, block, i in hits
+            ]
+
+        except Exception as e:
+            import traceback
+            print(f"Error in hashing search: {str(e)}")
+            print(traceback.format_exc())
+            return []
+
+    def size(self):
+        """Return (non-zeros, bytes of matrices plus IDF statistics)"""
+        snapshot = self._current()
+        nnz = sum(block.matrix.nnz for block in snapshot.blocks)
+        size = snapshot.doc_freq.nbytes + sum(
+            matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+            for block in snapshot.blocks for matrix in (block.matrix, block.columns)
+        )
+        return nnz, size
+
+
+def _result_row(article):
+    """Fields a search result reports for an article"""
+    return {
+        'title': str(article.get('Title', 'N/A')),
+        'url': str(article.get('URL', '')),
+        'claps': safe_int(article.get('Number of Claps', 0)),
+        'author': str(article.get('Author Name', 'N/A')),
+        'reading_time': str(article.get('Reading Time', 'N/A')),
+    }